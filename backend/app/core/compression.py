@@ -0,0 +1,115 @@
+import zlib
+from importlib.util import find_spec
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 只探测 zstandard 是否安装，首次压缩 zstd 响应时才导入；未安装时只提供 gzip
+# 同等权重时优先选择排在前面的编码
+SUPPORTED_ENCODINGS = ("zstd", "gzip") if find_spec("zstandard") is not None else ("gzip",)
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """根据 Accept-Encoding 及其 q 值选择响应压缩编码"""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    按 Accept-Encoding 协商的响应压缩（zstd/gzip），只压缩超过 minimum_size 的响应。
+    流式响应逐块压缩。
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message = {}
+        compressor = None
+        passthrough = False
+        started = False
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, compressor, passthrough, started
+            if message["type"] == "http.response.start":
+                start_message = message
+                headers = Headers(raw=message["headers"])
+                passthrough = "content-encoding" in headers or \
+                    headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+                return
+            if message["type"] != "http.response.body":
+                if not started:
+                    started = True
+                    await send(start_message)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if not started:
+                started = True
+                headers = MutableHeaders(raw=start_message["headers"])
+                if passthrough or (not more_body and len(body) < self.minimum_size):
+                    if not passthrough:
+                        headers.add_vary_header("Accept-Encoding")
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = self._compressor(encoding)
+                headers.add_vary_header("Accept-Encoding")
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                    message["body"] = compressor.compress(body)
+                else:
+                    message["body"] = compressor.compress(body) + compressor.flush()
+                    headers["Content-Length"] = str(len(message["body"]))
+                await send(start_message)
+                await send(message)
+                return
+
+            if compressor is not None:
+                message["body"] = compressor.compress(body)
+                if not more_body:
+                    message["body"] += compressor.flush()
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressor(self, encoding: str):
+        if encoding == "zstd":
+            import zstandard
+            return zstandard.ZstdCompressor(level=self.zstd_level).compressobj()
+        # wbits=31 输出 gzip 格式
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
@@ -15,6 +15,64 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key"  # 在生产环境中应该使用环境变量
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+
+    # 启动预热配置
+    WARMUP_ENABLED: bool = False
+    WARMUP_TOP_N: int = 20
+
+    # 渠道状态缓存为进程内缓存，超过该秒数后重新加载，使其他 worker 的映射变更生效
+    CHANNEL_STATE_TTL_SECONDS: float = 5.0
+
+    # 文档解析任务配置
+    DOC_PARSE_MAX_JOBS: int = 2
+    DOC_PARSE_WORKERS: int = 2
+    DOC_PARSE_BATCH_SIZE: int = 50
+    DOC_JOB_TTL_SECONDS: int = 3600
+
+    # 批量导入导出配置
+    BULK_IMPORT_BATCH_SIZE: int = 500
+    EXPORT_BATCH_SIZE: int = 200
+
+    # 映射推荐配置
+    RECOMMEND_MAX_CANDIDATES: int = 200
+
+    # 样本回放配置
+    REPLAY_MAX_JOBS: int = 2
+    REPLAY_WORKERS: Optional[int] = None  # 默认使用CPU核数，最多 REPLAY_MAX_DEFAULT_WORKERS 个
+    REPLAY_MAX_DEFAULT_WORKERS: int = 4
+    REPLAY_CHUNK_SIZE: int = 2000
+    REPLAY_MAX_EXAMPLES: int = 3
+    REPLAY_JOB_TTL_SECONDS: int = 3600
+
+    # 正则规则配置
+    REGEX_CACHE_SIZE: int = 512
+    REGEX_MAX_LENGTH: int = 500
+
+    # 渠道请求转发配置
+    DISPATCH_MAX_CONNECTIONS: int = 20
+    DISPATCH_MAX_KEEPALIVE: int = 10
+    DISPATCH_KEEPALIVE_EXPIRY: float = 30.0
+    DISPATCH_TIMEOUT: float = 10.0
+    DISPATCH_CONNECT_TIMEOUT: float = 3.0
+    DISPATCH_MAX_RETRIES: int = 2
+    DISPATCH_BACKOFF_BASE: float = 0.2
+    DISPATCH_BACKOFF_MAX: float = 2.0
+    DISPATCH_BREAKER_THRESHOLD: int = 5
+    DISPATCH_BREAKER_RESET_SECONDS: float = 30.0
+
+    # 审计日志配置
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    AUDIT_QUEUE_SIZE: int = 10000
+
+    # 响应压缩配置
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # 映射快照配置（转换工作进程模式）
+    SNAPSHOT_PATH: str = "./channel_snapshot.bin"
+    SNAPSHOT_POLL_SECONDS: float = 2.0
     
     class Config:
         case_sensitive = True
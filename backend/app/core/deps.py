@@ -1,4 +1,5 @@
-from typing import Generator
+from typing import Any, Callable, Generator, List, Optional
+from fastapi import Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from .database import SessionLocal
 
@@ -8,3 +9,23 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+def get_actor(x_actor: Optional[str] = Header(None)) -> str:
+    """审计日志中的操作人，取自 X-Actor 请求头"""
+    return x_actor or "anonymous"
+
+def field_projection(model: Any) -> Callable[..., Optional[List[str]]]:
+    """fields= 字段投影参数，只允许模型的列名，结果总是包含主键 id"""
+    columns = model.__table__.columns.keys()
+
+    def dependency(
+        fields: Optional[str] = Query(None, description="逗号分隔的返回字段，例如 name,code,status；指定后响应只包含这些字段及 id，未知字段返回 400")
+    ) -> Optional[List[str]]:
+        if not fields:
+            return None
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in columns]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        return list(dict.fromkeys(["id"] + names))
+    return dependency
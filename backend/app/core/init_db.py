@@ -1,8 +1,22 @@
+from sqlalchemy import inspect
 from app.models.channel import Base
-from app.core.database import engine
+from app.core.database import engine, SessionLocal
+from app.services.search_service import SearchService
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    init_search_index()
+
+def init_search_index():
+    """创建全文索引表，新建时从现有渠道回填"""
+    with engine.begin() as connection:
+        created = SearchService.ensure_index(connection)
+    if created and inspect(engine).has_table("channels"):
+        db = SessionLocal()
+        try:
+            SearchService(db).rebuild()
+        finally:
+            db.close()
 
 if __name__ == "__main__":
     init_db()
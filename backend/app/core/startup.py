@@ -0,0 +1,41 @@
+import threading
+import time
+from .config import settings
+from .database import SessionLocal
+
+# 启动状态，供就绪检查使用
+startup_state = {
+    "ready": False,
+    "import_seconds": None,
+    "warmup_seconds": None,
+    "warmed_channels": [],
+    "error": None,
+}
+
+def warm_up():
+    """预加载最常用渠道的映射与转换规则"""
+    from ..services.channel_state import channel_state_cache
+    from ..services.transform_service import compile_jsonpath
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # 提前完成jsonpath_ng的导入和语法构建
+        compile_jsonpath("$")
+        startup_state["warmed_channels"] = channel_state_cache.warm_up(db, settings.WARMUP_TOP_N)
+    except Exception as e:
+        startup_state["error"] = str(e)
+        print(f"Warm-up failed: {str(e)}")
+    finally:
+        db.close()
+        startup_state["warmup_seconds"] = round(time.perf_counter() - started, 4)
+        startup_state["ready"] = True
+        print(f"Warm-up finished in {startup_state['warmup_seconds']}s, "
+              f"channels: {startup_state['warmed_channels']}")
+
+def start_warm_up():
+    """启动预热，未开启预热时直接标记为就绪"""
+    if not settings.WARMUP_ENABLED:
+        startup_state["ready"] = True
+        return
+    threading.Thread(target=warm_up, name="channel-warmup", daemon=True).start()
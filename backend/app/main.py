@@ -1,7 +1,22 @@
+import sys
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import channels, mappings, transform
+from fastapi.responses import JSONResponse
+from .routers import audit, channels, mappings, transform
 from .core.config import settings
+from .core.compression import CompressionMiddleware
+from .core.startup import startup_state, start_warm_up
+from .core.init_db import init_search_index
+from .services.doc_jobs import doc_parse_jobs
+from .services.replay_service import replay_jobs
+from .services.single_flight import single_flight
+from .services.audit_log import audit_log
+
+startup_state["import_seconds"] = round(time.perf_counter() - _import_started, 4)
+print(f"App modules imported in {startup_state['import_seconds']}s")
 
 app = FastAPI(
     title="支付渠道管理系统",
@@ -18,11 +33,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+)
+
 # 注册路由
 app.include_router(channels.router, prefix=settings.API_V1_STR)
 app.include_router(mappings.router, prefix=settings.API_V1_STR)
 app.include_router(transform.router, prefix=settings.API_V1_STR)
+app.include_router(audit.router, prefix=settings.API_V1_STR)
+
+@app.on_event("startup")
+async def on_startup():
+    init_search_index()
+    start_warm_up()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    doc_parse_jobs.shutdown()
+    replay_jobs.shutdown()
+    # 转发服务（httpx）在首次转发时才导入，未加载过则无需关闭
+    dispatch_service = sys.modules.get(f"{__package__}.services.dispatch_service")
+    if dispatch_service is not None:
+        await dispatch_service.channel_dispatcher.shutdown()
+    audit_log.shutdown()
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Payment Channel Management System"}
+
+@app.get("/ready")
+async def ready():
+    """就绪检查，预热完成后才返回就绪"""
+    status_code = 200 if startup_state["ready"] else 503
+    return JSONResponse(status_code=status_code, content=startup_state)
+
+@app.get("/metrics")
+async def metrics():
+    """运行指标：读请求合并次数、审计日志写入情况"""
+    return {"single_flight": single_flight.stats(), "audit_log": audit_log.stats()}
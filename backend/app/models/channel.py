@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -19,6 +19,7 @@ class Channel(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     mappings = relationship("FieldMapping", back_populates="channel")
+    samples = relationship("ChannelSample", back_populates="channel")
 
 class FieldMapping(Base):
     __tablename__ = "field_mappings"
@@ -33,3 +34,28 @@ class FieldMapping(Base):
     description = Column(String(500))
     
     channel = relationship("Channel", back_populates="mappings")
+
+class ChannelSample(Base):
+    __tablename__ = "channel_samples"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    channel_id = Column(Integer, ForeignKey("channels.id"), index=True)
+    payload = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    channel = relationship("Channel", back_populates="samples")
+
+class AuditLog(Base):
+    __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_entity", "entity_type", "entity_id", "id"),
+        Index("ix_audit_logs_actor", "actor", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    actor = Column(String(100), nullable=False)
+    action = Column(String(20), nullable=False)
+    entity_type = Column(String(50), nullable=False)
+    entity_id = Column(Integer)
+    changes = Column(JSON)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
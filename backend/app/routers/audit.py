@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from ..core.deps import get_db
+from ..models.channel import AuditLog
+
+router = APIRouter(
+    prefix="/audit",
+    tags=["audit"]
+)
+
+@router.get("/")
+async def list_audit_logs(
+    entity_type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    actor: Optional[str] = None,
+    cursor: Optional[int] = Query(None, description="上一页返回的 next_cursor"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """按时间倒序分页查询审计日志；日志异步写入，最近的变更可能稍后才可见"""
+    query = db.query(AuditLog)
+    if entity_type:
+        query = query.filter(AuditLog.entity_type == entity_type)
+    if entity_id is not None:
+        query = query.filter(AuditLog.entity_id == entity_id)
+    if actor:
+        query = query.filter(AuditLog.actor == actor)
+    if cursor is not None:
+        query = query.filter(AuditLog.id < cursor)
+
+    # 按主键做游标分页，配合 (entity_type, entity_id, id) 和 (actor, id) 索引
+    items = query.order_by(AuditLog.id.desc()).limit(limit).all()
+    return {
+        "items": items,
+        "next_cursor": items[-1].id if len(items) == limit else None,
+    }
@@ -1,9 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from ..schemas.channel import ChannelCreate, ChannelUpdate, ChannelResponse
+from typing import List, Optional, Union
+import json
+from ..schemas.channel import ChannelCreate, ChannelUpdate, ChannelProjection, ChannelResponse
+from ..schemas.dispatch import DispatchRequest, DispatchResponse
 from ..services.channel_service import ChannelService
-from ..core.deps import get_db
+from ..services.doc_jobs import doc_parse_jobs
+from ..services.search_service import SearchService
+from ..services.channel_state import channel_state_cache
+from ..core.deps import field_projection, get_actor, get_db
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.channel import Channel
 
 router = APIRouter(
     prefix="/channels",
@@ -13,48 +23,151 @@ router = APIRouter(
 @router.post("/", response_model=ChannelResponse)
 async def create_channel(
     channel: ChannelCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    actor: str = Depends(get_actor)
 ):
     """创建新的支付渠道"""
-    channel_service = ChannelService(db)
+    channel_service = ChannelService(db, actor)
     return channel_service.create_channel(channel)
 
-@router.get("/", response_model=List[ChannelResponse])
+@router.get("/", response_model=List[Union[ChannelResponse, ChannelProjection]])
 async def list_channels(
     skip: int = 0,
     limit: int = 100,
+    fields: Optional[List[str]] = Depends(field_projection(Channel)),
     db: Session = Depends(get_db)
 ):
-    """获取渠道列表"""
+    """获取渠道列表，fields 指定时只查询并返回这些字段（ChannelProjection）"""
     channel_service = ChannelService(db)
+    if fields:
+        return JSONResponse(jsonable_encoder(channel_service.get_channels_projected(fields, skip=skip, limit=limit)))
     return channel_service.get_channels(skip=skip, limit=limit)
 
-@router.get("/{channel_id}", response_model=ChannelResponse)
+@router.post("/bulk")
+async def bulk_import_channels(
+    request: Request,
+    batch_size: Optional[int] = Query(None, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    actor: str = Depends(get_actor)
+):
+    """批量导入渠道，支持JSON数组或NDJSON（application/x-ndjson）"""
+    channel_service = ChannelService(db, actor)
+    batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+    summary = {"created": 0, "conflicts": [], "errors": []}
+
+    def flush(batch):
+        result = channel_service.import_channels(batch)
+        summary["created"] += result["created"]
+        summary["conflicts"].extend(result["conflicts"])
+        summary["errors"].extend(result["errors"])
+
+    batch = []
+    try:
+        async for row, raw, error in _iter_import_rows(request):
+            if error:
+                summary["errors"].append({"row": row, "error": error})
+                continue
+            batch.append((row, raw))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return summary
+
+@router.get("/export")
+async def export_channels():
+    """以NDJSON流式导出全部渠道及其映射"""
+    def generate():
+        # 流式响应期间使用独立会话
+        db = SessionLocal()
+        try:
+            for channel in ChannelService(db).export_channels():
+                yield json.dumps(channel, ensure_ascii=False, default=str) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@router.get("/search")
+async def search_channels(
+    q: str,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """全文检索渠道及其解析字段"""
+    return SearchService(db).search(q, page=page, page_size=page_size)
+
+@router.get("/{channel_id}", response_model=Union[ChannelResponse, ChannelProjection])
 async def get_channel(
     channel_id: int,
+    fields: Optional[List[str]] = Depends(field_projection(Channel)),
     db: Session = Depends(get_db)
 ):
-    """获取单个渠道详情"""
+    """获取单个渠道详情，fields 指定时只查询并返回这些字段（ChannelProjection）"""
     channel_service = ChannelService(db)
-    channel = channel_service.get_channel(channel_id)
+    if fields:
+        channel = channel_service.get_channel_projected(channel_id, fields)
+    else:
+        channel = channel_service.get_channel(channel_id)
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
-    return channel
+    return JSONResponse(jsonable_encoder(channel)) if fields else channel
 
 @router.post("/{channel_id}/doc")
 async def upload_api_doc(
     channel_id: int,
     doc_file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    actor: str = Depends(get_actor)
 ):
     """上传并解析渠道API文档"""
-    channel_service = ChannelService(db)
+    channel_service = ChannelService(db, actor)
     try:
-        fields = await channel_service.parse_api_doc(channel_id, doc_file)
-        return {"status": "success", "fields": fields}
+        job = await channel_service.parse_api_doc(channel_id, doc_file)
+        return {"status": job["status"], "job_id": job["job_id"]}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/{channel_id}/doc/jobs/{job_id}")
+async def get_doc_job(
+    channel_id: int,
+    job_id: str
+):
+    """查询文档解析任务进度"""
+    job = doc_parse_jobs.get(job_id)
+    if not job or job["channel_id"] != channel_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/{channel_id}/dispatch", response_model=DispatchResponse)
+async def dispatch_request(
+    channel_id: int,
+    dispatch: DispatchRequest,
+    db: Session = Depends(get_db)
+):
+    """按渠道映射转换请求并转发到渠道接口，返回按响应映射转换后的结果；渠道返回5xx时返回502"""
+    # httpx 在首次转发时才导入，不拖慢应用启动
+    from ..services.dispatch_service import DispatchError, channel_dispatcher
+
+    channel_service = ChannelService(db)
+    channel = channel_service.get_channel(channel_id)
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    if not channel.api_base_url:
+        raise HTTPException(status_code=400, detail="Channel has no api_base_url")
+
+    state = channel_state_cache.get(db, channel_id)
+    try:
+        return await channel_dispatcher.dispatch(
+            channel, state['mappings'], dispatch.method, dispatch.path, dispatch.data, dispatch.headers
+        )
+    except DispatchError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
 @router.get("/{channel_id}/mappings")
 async def get_channel_mappings(
     channel_id: int,
@@ -67,3 +180,35 @@ async def get_channel_mappings(
         raise HTTPException(status_code=404, detail="Channel not found")
     # 暂时返回空映射，后续实现从数据库获取
     return {"mappings": []}
+
+
+async def _iter_import_rows(request: Request):
+    """逐行读取导入数据，产出 (行号, 数据, 错误)"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        row = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    row += 1
+                    yield _load_row(row, line)
+        if buffer.strip():
+            yield _load_row(row + 1, buffer)
+    else:
+        try:
+            items = json.loads(await request.body())
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {str(e)}")
+        if not isinstance(items, list):
+            raise ValueError("Request body must be a JSON array")
+        for row, item in enumerate(items, start=1):
+            yield row, item, None
+
+def _load_row(row: int, line: bytes):
+    try:
+        return row, json.loads(line), None
+    except json.JSONDecodeError as e:
+        return row, None, f"Invalid JSON: {str(e)}"
@@ -1,10 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from ..services.transform_service import TransformService, TransformRule
 from ..services.validation_service import ValidationService
-from ..core.deps import get_db
-from ..models.channel import Channel, FieldMapping
+from ..services.channel_state import channel_state_cache
+from ..services.mapping_recommender import mapping_recommender
+from ..services.replay_service import replay_jobs
+from ..services.single_flight import single_flight
+from ..services.audit_log import audit_log, mappings_snapshot
+from sqlalchemy import insert
+from ..core.deps import field_projection, get_actor, get_db
+from ..core.database import SessionLocal
+from ..models.channel import Channel, FieldMapping, ChannelSample
 from ..schemas.mapping import (
     MappingCreate,
     MappingUpdate,
@@ -22,25 +30,40 @@ router = APIRouter(
 @router.get("/{channel_id}")
 async def get_mappings(
     channel_id: int,
-    db: Session = Depends(get_db)
+    fields: Optional[List[str]] = Depends(field_projection(FieldMapping))
 ):
-    """获取渠道的字段映射配置"""
+    """获取渠道的字段映射配置，fields 指定时只查询并返回这些字段"""
+    print(f"Received mapping retrieval request for channel {channel_id}")
+    # 并发的相同请求共享一次查询，映射版本变化后不会复用旧结果
+    key = ("get_mappings", channel_id, channel_state_cache.version(channel_id), tuple(fields or ()))
+    return await single_flight.do(key, _load_mappings, channel_id, fields)
+
+def _load_mappings(channel_id: int, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    db = SessionLocal()
     try:
-        print(f"Received mapping retrieval request for channel {channel_id}")
-        mappings = db.query(FieldMapping).filter(
+        if fields:
+            query = db.query(*[getattr(FieldMapping, name) for name in fields])
+        else:
+            query = db.query(FieldMapping)
+        mappings = query.filter(
             FieldMapping.channel_id == channel_id
         ).all()
         print(f"Retrieved {len(mappings)} mappings")
-        return {"mappings": mappings}
+        if fields:
+            mappings = [row._asdict() for row in mappings]
+        return jsonable_encoder({"mappings": mappings})
     except Exception as e:
         print(f"Error retrieving mappings: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        db.close()
 
 @router.post("/{channel_id}")
 async def create_mappings(
     channel_id: int,
     mappings: List[MappingCreate],
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    actor: str = Depends(get_actor)
 ):
     """创建字段映射配置"""
     print(f"Received mapping creation request for channel {channel_id}")
@@ -65,6 +88,9 @@ async def create_mappings(
             detail={"validation_errors": validation_result['errors']}
         )
 
+    # 保存前的映射，用于样本回放对比
+    old_mappings = channel_state_cache.get(db, channel_id)['mappings']
+
     try:
         # 删除现有的映射
         db.query(FieldMapping).filter(FieldMapping.channel_id == channel_id).delete()
@@ -89,12 +115,31 @@ async def create_mappings(
             
         db.add_all(new_mappings)
         db.commit()
+        channel_state_cache.invalidate(channel_id)
         
         # 刷新以获取新的ID
         for mapping in new_mappings:
             db.refresh(mapping)
+
+        audit_log.record(actor, "update", "mappings", channel_id,
+                         before=mappings_snapshot(old_mappings), after=mappings_snapshot(new_mappings))
+
+        mapping_recommender.update_channel(
+            channel_id,
+            new_mappings,
+            channel.config.get('parsed_fields', [])
+        )
+
+        # 存在样本语料时，在后台用新旧映射回放对比
+        replay_job_id = None
+        if db.query(ChannelSample.id).filter(ChannelSample.channel_id == channel_id).first():
+            replay_job_id = replay_jobs.submit(
+                channel_id,
+                old_mappings,
+                channel_state_cache.get(db, channel_id)['mappings']
+            )["job_id"]
             
-        return {"mappings": new_mappings}
+        return {"mappings": new_mappings, "replay_job_id": replay_job_id}
         
     except Exception as e:
         db.rollback()
@@ -132,44 +177,178 @@ async def test_mappings(
         print(f"Error testing mapping: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/{channel_id}/validate")
-async def validate_mappings(
+@router.post("/{channel_id}/trace")
+async def trace_mappings(
     channel_id: int,
+    test_request: TestRequest,
     db: Session = Depends(get_db)
+):
+    """使用已保存的映射转换完整样例报文，返回每个字段的转换步骤与耗时"""
+    channel = db.query(Channel).filter(Channel.id == channel_id).first()
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+
+    state = channel_state_cache.get(db, channel_id)
+    return TransformService.trace_transform(test_request.input_data, state['mappings'])
+
+@router.get("/{channel_id}/validate")
+async def validate_mappings(
+    channel_id: int
 ):
     """验证字段映射配置"""
     print(f"Received mapping validation request for channel {channel_id}")
-    validation_service = ValidationService()
-    
+    key = ("validate_mappings", channel_id, channel_state_cache.version(channel_id))
+    return await single_flight.do(key, _validate_channel_mappings, channel_id)
+
+def _validate_channel_mappings(channel_id: int) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        validation_service = ValidationService()
+
+        channel = db.query(Channel).filter(Channel.id == channel_id).first()
+        if not channel:
+            print(f"Channel {channel_id} not found")
+            raise HTTPException(status_code=404, detail="Channel not found")
+
+        mappings = db.query(FieldMapping).filter(
+            FieldMapping.channel_id == channel_id
+        ).all()
+
+        validation_result = validation_service.validate_mappings(
+            [mapping.__dict__ for mapping in mappings],
+            channel.config.get('parsed_fields', [])
+        )
+
+        print(f"Validation result: {validation_result}")
+        return jsonable_encoder(validation_result)
+    finally:
+        db.close()
+
+@router.post("/{channel_id}/samples")
+async def add_samples(
+    channel_id: int,
+    samples: List[Dict[str, Any]],
+    db: Session = Depends(get_db)
+):
+    """向渠道样本语料中添加样例报文"""
     channel = db.query(Channel).filter(Channel.id == channel_id).first()
     if not channel:
-        print(f"Channel {channel_id} not found")
         raise HTTPException(status_code=404, detail="Channel not found")
 
-    mappings = db.query(FieldMapping).filter(
-        FieldMapping.channel_id == channel_id
-    ).all()
+    if samples:
+        db.execute(insert(ChannelSample.__table__), [
+            {"channel_id": channel_id, "payload": payload} for payload in samples
+        ])
+        db.commit()
+    total = db.query(ChannelSample).filter(ChannelSample.channel_id == channel_id).count()
+    return {"added": len(samples), "total": total}
 
-    validation_result = validation_service.validate_mappings(
-        [mapping.__dict__ for mapping in mappings],
-        channel.config.get('parsed_fields', [])
+@router.get("/{channel_id}/samples")
+async def list_samples(
+    channel_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """分页获取渠道样本语料"""
+    query = db.query(ChannelSample).filter(ChannelSample.channel_id == channel_id)
+    samples = query.order_by(ChannelSample.id).offset(skip).limit(limit).all()
+    return {
+        "total": query.count(),
+        "samples": [
+            {"id": sample.id, "payload": sample.payload, "created_at": sample.created_at}
+            for sample in samples
+        ]
+    }
+
+@router.delete("/{channel_id}/samples")
+async def delete_samples(
+    channel_id: int,
+    db: Session = Depends(get_db)
+):
+    """清空渠道样本语料"""
+    deleted = db.query(ChannelSample).filter(ChannelSample.channel_id == channel_id).delete()
+    db.commit()
+    return {"deleted": deleted}
+
+@router.post("/{channel_id}/replay")
+async def replay_mappings(
+    channel_id: int,
+    mappings: List[MappingCreate],
+    db: Session = Depends(get_db)
+):
+    """不保存映射，用样本语料对比当前映射与待保存映射的转换结果"""
+    channel = db.query(Channel).filter(Channel.id == channel_id).first()
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+
+    new_mappings = [{
+        'internal_field': mapping.mapping_rules.get('internal_field'),
+        'channel_field': mapping.mapping_rules.get('channel_field'),
+        'transform_rule': mapping.mapping_rules.get('transform_rule'),
+        'is_required': mapping.mapping_rules.get('is_required', False),
+    } for mapping in mappings]
+    return replay_jobs.submit(
+        channel_id,
+        channel_state_cache.get(db, channel_id)['mappings'],
+        new_mappings
     )
 
-    print(f"Validation result: {validation_result}")
-    return validation_result
+@router.get("/{channel_id}/replay/{job_id}")
+async def get_replay_job(
+    channel_id: int,
+    job_id: str
+):
+    """查询样本回放任务进度与差异报告"""
+    job = replay_jobs.get(job_id)
+    if not job or job["channel_id"] != channel_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{channel_id}/suggestions")
+def suggest_mappings(
+    channel_id: int,
+    limit: int = 5,
+    min_score: float = 0.2,
+    db: Session = Depends(get_db)
+):
+    """根据其他渠道已有映射推荐内部字段；逐字段计算较耗时，同步路由在线程池中执行，不阻塞事件循环"""
+    channel = db.query(Channel).filter(Channel.id == channel_id).first()
+    if not channel:
+        raise HTTPException(status_code=404, detail="Channel not found")
+
+    suggestions = []
+    for field in (channel.config or {}).get('parsed_fields', []):
+        suggestions.append({
+            "channel_field": field['name'],
+            "source": field.get('source'),
+            "candidates": mapping_recommender.suggest(
+                db,
+                field,
+                limit=limit,
+                min_score=min_score,
+                exclude_channel_id=channel_id
+            )
+        })
+    return {"suggestions": suggestions}
 
 @router.delete("/{channel_id}")
 async def delete_mappings(
     channel_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    actor: str = Depends(get_actor)
 ):
     """删除渠道的所有字段映射配置"""
     try:
         print(f"Deleting all mappings for channel {channel_id}")
+        old_mappings = channel_state_cache.get(db, channel_id)['mappings']
         db.query(FieldMapping).filter(
             FieldMapping.channel_id == channel_id
         ).delete()
         db.commit()
+        channel_state_cache.invalidate(channel_id)
+        mapping_recommender.remove_channel(channel_id)
+        audit_log.record(actor, "delete", "mappings", channel_id, before=mappings_snapshot(old_mappings))
         print(f"Successfully deleted all mappings for channel {channel_id}")
         return {"message": "所有映射已删除"}
     except Exception as e:
@@ -1,6 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
 from ..schemas.transform import TransformRequest, TransformResponse
+from ..schemas.mapping import TestRequest
 from ..services.transform_service import TransformService
+from ..services.channel_state import channel_state_cache
+from ..core.deps import get_db
+from ..models.channel import Channel
 
 router = APIRouter(
     prefix="/transform",
@@ -21,3 +27,39 @@ def test_transform(request: TransformRequest):
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+def channel_mappings(
+    channel_id: int,
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
+    """渠道的字段映射；转换工作进程（app.worker）中替换为从快照读取"""
+    if not db.query(Channel.id).filter(Channel.id == channel_id).first():
+        raise HTTPException(status_code=404, detail="Channel not found")
+    return channel_state_cache.get(db, channel_id)['mappings']
+
+@router.post("/{channel_id}")
+def transform_payload(
+    channel_id: int,
+    request: TestRequest,
+    mappings: List[Dict[str, Any]] = Depends(channel_mappings)
+):
+    """使用渠道映射转换报文"""
+    try:
+        return {
+            "success": True,
+            "result": TransformService.batch_transform(request.input_data, mappings)
+        }
+    except ValueError as e:
+        return {
+            "success": False,
+            "errors": e.args[0].get('errors', [])
+        }
+
+@router.post("/{channel_id}/trace")
+def trace_payload(
+    channel_id: int,
+    request: TestRequest,
+    mappings: List[Dict[str, Any]] = Depends(channel_mappings)
+):
+    """使用渠道映射转换报文，返回每个字段的转换步骤与耗时"""
+    return TransformService.trace_transform(request.input_data, mappings)
@@ -1,4 +1,5 @@
-from typing import Optional, Dict, Any
+from datetime import datetime
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
 
 class ChannelBase(BaseModel):
@@ -22,3 +23,29 @@ class ChannelResponse(ChannelBase):
 
     class Config:
         orm_mode = True
+
+class ChannelProjection(BaseModel):
+    """fields= 投影后的渠道，只包含请求的字段及 id"""
+    id: int
+    name: Optional[str] = None
+    code: Optional[str] = None
+    api_base_url: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    config: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class ChannelMappingImport(BaseModel):
+    channel_field: str
+    internal_field: str
+    field_type: Optional[str] = "string"
+    is_required: bool = False
+    transform_rule: Optional[Any] = None
+    description: Optional[str] = None
+
+class ChannelImport(ChannelCreate):
+    mappings: List[ChannelMappingImport] = []
@@ -0,0 +1,16 @@
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+class DispatchRequest(BaseModel):
+    path: str = ""
+    method: str = "POST"
+    data: Dict[str, Any]
+    headers: Optional[Dict[str, str]] = None
+
+class DispatchResponse(BaseModel):
+    status_code: int
+    attempts: int
+    request: Dict[str, Any]
+    response: Any
+    data: Dict[str, Any]
+    errors: list = []
@@ -0,0 +1,211 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.channel import AuditLog
+
+_STOP = object()
+
+
+def channel_snapshot(channel: Any) -> Dict[str, Any]:
+    """渠道的审计快照，解析字段只记录数量，避免日志随文档规模膨胀"""
+    config = getattr(channel, 'config', None) or {}
+    return {
+        'name': channel.name,
+        'code': channel.code,
+        'api_base_url': getattr(channel, 'api_base_url', None),
+        'status': getattr(channel, 'status', None),
+        'description': getattr(channel, 'description', None),
+        'doc_type': config.get('doc_type'),
+        'parsed_field_count': len(config.get('parsed_fields', [])),
+        'schema_hashes': config.get('schema_hashes'),
+    }
+
+
+class MappingsSnapshot(dict):
+    """映射列表的审计快照；转换规则保留原始值，写入前在后台线程中解析"""
+
+
+def mappings_snapshot(mappings: List[Any]) -> Dict[str, Any]:
+    """映射列表的审计快照，按渠道字段为键，便于逐字段比较；请求中只复制字段值"""
+    def value(mapping, name):
+        return mapping.get(name) if isinstance(mapping, dict) else getattr(mapping, name, None)
+
+    snapshot = MappingsSnapshot()
+    counts: Dict[str, int] = {}
+    for mapping in mappings:
+        key = value(mapping, 'channel_field') or ''
+        counts[key] = counts.get(key, 0) + 1
+        if counts[key] > 1:
+            # 同一渠道字段的多条映射按出现顺序区分
+            key = f"{key}#{counts[key]}"
+        snapshot[key] = {
+            'internal_field': value(mapping, 'internal_field'),
+            'field_type': value(mapping, 'field_type'),
+            'is_required': value(mapping, 'is_required'),
+            'transform_rule': value(mapping, 'transform_rule'),
+            'description': value(mapping, 'description'),
+        }
+    return snapshot
+
+
+def _resolve(snapshot: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """解析映射快照中的转换规则，无法解析的规则按原始值记录"""
+    if not isinstance(snapshot, MappingsSnapshot):
+        return snapshot
+    from .transform_service import parse_transform_rule
+
+    resolved = {}
+    for key, mapping in snapshot.items():
+        mapping = dict(mapping)
+        try:
+            mapping['transform_rule'] = parse_transform_rule(mapping['transform_rule'])
+        except Exception:
+            pass
+        resolved[key] = mapping
+    return resolved
+
+
+def diff(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """逐键比较前后快照，只保留有变化的键"""
+    before = before or {}
+    after = after or {}
+    return {
+        key: {'before': before.get(key), 'after': after.get(key)}
+        for key in list(before) + [key for key in after if key not in before]
+        if before.get(key) != after.get(key)
+    }
+
+
+class AuditLogger:
+    """
+    审计日志异步写入：写请求只把记录放入进程内队列，
+    后台线程在攒够 AUDIT_BATCH_SIZE 条或等待 AUDIT_FLUSH_INTERVAL_SECONDS 后批量写库。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=settings.AUDIT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        # 请求线程与后台线程都会更新计数
+        self._stats_lock = threading.Lock()
+        self._stats = {"recorded": 0, "written": 0, "dropped": 0}
+
+    def record(self, actor: str, action: str, entity_type: str, entity_id: Optional[int],
+               before: Optional[Dict[str, Any]] = None, after: Optional[Dict[str, Any]] = None):
+        """记录一次变更；快照的解析与差异计算都在后台线程中进行。可在事件循环中调用，不会阻塞"""
+        self._ensure_started()
+        self._count("recorded")
+        try:
+            self._queue.put_nowait({
+                "actor": actor,
+                "action": action,
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "before": before,
+                "after": after,
+                "created_at": datetime.utcnow(),
+            })
+        except queue.Full:
+            # 队列满说明写库跟不上，丢弃并计数，不阻塞请求
+            self._count("dropped")
+            print(f"Dropped audit log {action} {entity_type} {entity_id}: queue full")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["pending"] = stats["recorded"] - stats["written"] - stats["dropped"]
+        return stats
+
+    def shutdown(self):
+        """写入队列中剩余的记录后停止后台线程"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                entry = None
+
+            if entry is _STOP:
+                self._flush(batch)
+                return
+            if entry is not None:
+                if not batch:
+                    deadline = time.monotonic() + settings.AUDIT_FLUSH_INTERVAL_SECONDS
+                batch.append(entry)
+            if batch and (len(batch) >= settings.AUDIT_BATCH_SIZE or time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        rows = []
+        for entry in batch:
+            # 单条记录的差异计算失败不影响同批其他记录及后台线程
+            try:
+                changes = diff(_resolve(entry["before"]), _resolve(entry["after"]))
+            except Exception as e:
+                print(f"Error computing audit changes for {entry['entity_type']} {entry['entity_id']}: {str(e)}")
+                self._count("dropped")
+                continue
+            rows.append({
+                "actor": entry["actor"],
+                "action": entry["action"],
+                "entity_type": entry["entity_type"],
+                "entity_id": entry["entity_id"],
+                "changes": changes,
+                "created_at": entry["created_at"],
+            })
+        if not rows:
+            return
+
+        db = SessionLocal()
+        try:
+            try:
+                db.execute(insert(AuditLog.__table__), rows)
+                db.commit()
+                self._count("written", len(rows))
+                return
+            except Exception as e:
+                db.rollback()
+                print(f"Error writing audit log batch, retrying rows individually: {str(e)}")
+            # 批量写入失败时逐条写入，仍然失败的记录丢弃，不再随后续批次重试
+            for row in rows:
+                try:
+                    db.execute(insert(AuditLog.__table__), [row])
+                    db.commit()
+                    self._count("written")
+                except Exception as e:
+                    db.rollback()
+                    self._count("dropped")
+                    print(f"Dropped audit log {row['action']} {row['entity_type']} {row['entity_id']}: {str(e)}")
+        finally:
+            db.close()
+
+
+audit_log = AuditLogger()
@@ -1,13 +1,27 @@
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from fastapi import UploadFile
+from pydantic import ValidationError
+from ..core.config import settings
 from ..models.channel import Channel, FieldMapping
-from ..schemas.channel import ChannelCreate
+from ..schemas.channel import ChannelCreate, ChannelImport
 from ..services.doc_parser import APIDocumentParser
+from ..services.field_catalog import FieldCatalog
+from ..services.doc_jobs import doc_parse_jobs
+from ..services.search_service import SearchService
+from ..services.mapping_recommender import mapping_recommender
+from ..services.channel_state import channel_state_cache, parse_transform_rule
+from ..services.validation_service import ValidationService
+from ..services.audit_log import audit_log, channel_snapshot, mappings_snapshot
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 import json
 
 class ChannelService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, actor: str = "system"):
         self.db = db
+        self.actor = actor
         self.doc_parser = APIDocumentParser()
 
     def create_channel(self, channel: ChannelCreate) -> Channel:
@@ -21,10 +35,141 @@ class ChannelService:
             config=channel.config
         )
         self.db.add(db_channel)
+        self.db.flush()
+        SearchService(self.db).index_channel(db_channel)
         self.db.commit()
         self.db.refresh(db_channel)
+        audit_log.record(self.actor, "create", "channel", db_channel.id, after=channel_snapshot(db_channel))
         return db_channel
 
+    def import_channels(self, rows: List[Tuple[int, Any]]) -> Dict[str, Any]:
+        """在一个事务中导入一批渠道及其映射，rows 为 (行号, 原始数据)"""
+        result = {"created": 0, "conflicts": [], "errors": []}
+
+        validation_service = ValidationService()
+        items = []
+        for row, raw in rows:
+            try:
+                item = ChannelImport.parse_obj(raw)
+            except ValidationError as e:
+                result["errors"].append({"row": row, "error": e.errors()})
+                continue
+            # 映射与保存接口使用相同的校验，未通过的整行拒绝
+            validation_errors = _validate_import_mappings(item, validation_service)
+            if validation_errors:
+                result["errors"].append({"row": row, "error": {"validation_errors": validation_errors}})
+            else:
+                items.append((row, item))
+
+        # 检查与现有渠道及本批次内的编码冲突
+        codes = [item.code for _, item in items]
+        existing = {code for (code,) in self.db.query(Channel.code).filter(Channel.code.in_(codes))} if codes else set()
+        accepted = {}
+        for row, item in items:
+            if item.code in existing or item.code in accepted:
+                result["conflicts"].append({"row": row, "code": item.code, "error": "Channel code already exists"})
+            else:
+                accepted[item.code] = (row, item)
+        if not accepted:
+            return result
+
+        try:
+            channel_ids = self._insert_imports(list(accepted.values()))
+        except IntegrityError:
+            # 并发写入导致的冲突：整批已回滚到保存点，逐行重新导入，只有实际冲突的行报告为冲突
+            channel_ids = {}
+            for row, item in list(accepted.values()):
+                try:
+                    channel_ids.update(self._insert_imports([(row, item)]))
+                except IntegrityError as e:
+                    del accepted[item.code]
+                    result["conflicts"].append({"row": row, "code": item.code, "error": str(e.orig)})
+        self.db.commit()
+
+        for _, item in accepted.values():
+            audit_log.record(self.actor, "import", "channel", channel_ids[item.code], after=channel_snapshot(item))
+            if item.mappings:
+                audit_log.record(self.actor, "import", "mappings", channel_ids[item.code],
+                                 after=mappings_snapshot([mapping.dict() for mapping in item.mappings]))
+                mapping_recommender.update_channel(
+                    channel_ids[item.code],
+                    [mapping.dict() for mapping in item.mappings],
+                    (item.config or {}).get('parsed_fields', [])
+                )
+        result["created"] = len(accepted)
+        return result
+
+    def _insert_imports(self, items: List[Tuple[int, ChannelImport]]) -> Dict[str, int]:
+        """在保存点中写入渠道、映射及搜索索引，失败时只回滚这一部分；返回编码到渠道ID的映射"""
+        with self.db.begin_nested():
+            self.db.execute(insert(Channel.__table__), [{
+                "name": item.name,
+                "code": item.code,
+                "api_base_url": item.api_base_url,
+                "description": item.description,
+                "status": item.status,
+                "config": item.config,
+            } for _, item in items])
+            codes = [item.code for _, item in items]
+            channel_ids = dict(self.db.query(Channel.code, Channel.id).filter(Channel.code.in_(codes)))
+
+            mapping_rows = [{
+                "channel_id": channel_ids[item.code],
+                "channel_field": mapping.channel_field,
+                "internal_field": mapping.internal_field,
+                "field_type": mapping.field_type,
+                "is_required": mapping.is_required,
+                "transform_rule": _dump_transform_rule(mapping.transform_rule),
+                "description": mapping.description or '',
+            } for _, item in items for mapping in item.mappings]
+            if mapping_rows:
+                self.db.execute(insert(FieldMapping.__table__), mapping_rows)
+
+            SearchService(self.db).index_channels([
+                SimpleNamespace(id=channel_ids[item.code], name=item.name, code=item.code,
+                                description=item.description, config=item.config)
+                for _, item in items
+            ])
+        return channel_ids
+
+    def export_channels(self) -> Iterator[Dict[str, Any]]:
+        """按主键分批导出渠道及其映射，避免一次性加载全部数据"""
+        last_id = 0
+        while True:
+            channels = self.db.query(Channel).filter(Channel.id > last_id) \
+                .order_by(Channel.id).limit(settings.EXPORT_BATCH_SIZE).all()
+            if not channels:
+                break
+
+            mappings: Dict[int, List[Dict[str, Any]]] = {channel.id: [] for channel in channels}
+            for mapping in self.db.query(FieldMapping).filter(
+                FieldMapping.channel_id.in_(list(mappings))
+            ).order_by(FieldMapping.id):
+                mappings[mapping.channel_id].append({
+                    "channel_field": mapping.channel_field,
+                    "internal_field": mapping.internal_field,
+                    "field_type": mapping.field_type,
+                    "is_required": mapping.is_required,
+                    "transform_rule": mapping.transform_rule,
+                    "description": mapping.description,
+                })
+
+            for channel in channels:
+                yield {
+                    "id": channel.id,
+                    "name": channel.name,
+                    "code": channel.code,
+                    "api_base_url": channel.api_base_url,
+                    "description": channel.description,
+                    "status": channel.status,
+                    "config": channel.config,
+                    "mappings": mappings[channel.id],
+                }
+
+            last_id = channels[-1].id
+            # 释放已导出批次占用的对象
+            self.db.expunge_all()
+
     def get_channels(self, skip: int = 0, limit: int = 100):
         """获取渠道列表"""
         return self.db.query(Channel).offset(skip).limit(limit).all()
@@ -33,28 +178,113 @@ class ChannelService:
         """获取单个渠道"""
         return self.db.query(Channel).filter(Channel.id == channel_id).first()
 
+    def get_channels_projected(self, fields: List[str], skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """只查询指定列的渠道列表"""
+        columns = [getattr(Channel, name) for name in fields]
+        return [row._asdict() for row in self.db.query(*columns).offset(skip).limit(limit)]
+
+    def get_channel_projected(self, channel_id: int, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """只查询指定列的单个渠道"""
+        columns = [getattr(Channel, name) for name in fields]
+        row = self.db.query(*columns).filter(Channel.id == channel_id).first()
+        return row._asdict() if row else None
+
     async def parse_api_doc(self, channel_id: int, doc_file: UploadFile):
-        """解析API文档"""
+        """提交API文档解析任务"""
         # 确保渠道存在
         channel = self.get_channel(channel_id)
         if not channel:
             raise ValueError("Channel not found")
 
-        # 读取文件内容
+        # 读取文件内容，解析在后台任务中进行
         content = await doc_file.read()
-        try:
-            doc_content = json.loads(content)
-        except json.JSONDecodeError:
-            raise ValueError("Invalid API document format")
-        
-        # 解析文档
-        fields = self.doc_parser.parse(doc_content)
-        
-        # 保存解析结果
+        return doc_parse_jobs.submit(channel_id, content, doc_file.content_type, self.actor)
+
+    def save_parsed_fields(self, channel_id: int, fields: FieldCatalog, doc_type: Optional[str],
+                           schema_hashes: Optional[Dict[str, str]] = None):
+        """保存文档解析结果"""
+        channel = self.get_channel(channel_id)
+        if not channel:
+            raise ValueError("Channel not found")
+
+        before = channel_snapshot(channel)
         channel.config = {
-            "parsed_fields": fields,
-            "doc_type": doc_file.content_type
+            "parsed_fields": fields.to_dicts() if isinstance(fields, FieldCatalog) else fields,
+            "doc_type": doc_type,
+            "schema_hashes": schema_hashes or {}
         }
+        SearchService(self.db).index_channel(channel)
         
         self.db.commit()
+        audit_log.record(self.actor, "update", "channel", channel_id, before=before, after=channel_snapshot(channel))
+        # 推荐索引包含解析字段的描述，字段更新后重建该渠道的索引
+        mapping_recommender.update_channel(
+            channel_id,
+            self.db.query(FieldMapping).filter(FieldMapping.channel_id == channel_id).all(),
+            channel.config["parsed_fields"]
+        )
+        # 验证结果依赖解析字段，递增版本使合并的读请求不复用旧结果
+        channel_state_cache.invalidate(channel_id)
         return fields
+
+    def revalidate_mappings(self, channel_id: int, field_names: Set[str], fields: FieldCatalog) -> List[Dict[str, Any]]:
+        """只重新验证引用了变更字段的映射"""
+        if not field_names:
+            return []
+
+        validation_service = ValidationService()
+        results = []
+        for mapping in self.db.query(FieldMapping).filter(
+            FieldMapping.channel_id == channel_id
+        ).order_by(FieldMapping.id):
+            name = (mapping.channel_field or '').split('.')[-1]
+            if name not in field_names:
+                continue
+
+            try:
+                errors = validation_service.validate_mapping({
+                    'description': mapping.description,
+                    'mapping_rules': {
+                        'channel_field': mapping.channel_field,
+                        'internal_field': mapping.internal_field,
+                        'transform_rule': parse_transform_rule(mapping.transform_rule),
+                    }
+                }, fields.get(name))
+            except ValueError as e:
+                errors = [f"Invalid transform rule: {str(e)}"]
+            if name not in fields:
+                errors.append(f"Channel field no longer exists in API document: {name}")
+
+            results.append({
+                'mapping_id': mapping.id,
+                'channel_field': mapping.channel_field,
+                'internal_field': mapping.internal_field,
+                'valid': not errors,
+                'errors': errors,
+            })
+        return results
+
+
+def _validate_import_mappings(item: ChannelImport, validation_service: ValidationService) -> List[Dict[str, Any]]:
+    """解析并校验导入的映射，转换规则统一解析为字典；返回与映射保存接口相同格式的校验错误"""
+    errors = []
+    for mapping in item.mappings:
+        if not isinstance(mapping.transform_rule, str):
+            continue
+        try:
+            mapping.transform_rule = parse_transform_rule(mapping.transform_rule)
+        except ValueError as e:
+            errors.append({'mapping': {'mapping_rules': mapping.dict()}, 'errors': [f"Invalid transform rule: {str(e)}"]})
+    if errors:
+        return errors
+
+    validation_result = validation_service.validate_mappings(
+        [{'mapping_rules': mapping.dict()} for mapping in item.mappings],
+        (item.config or {}).get('parsed_fields', [])
+    )
+    return validation_result['errors']
+
+
+def _dump_transform_rule(rule: Any) -> Optional[str]:
+    """与映射保存接口一致，转换规则以JSON字符串存储"""
+    return json.dumps(rule) if rule else None
@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.channel import Channel, FieldMapping
+from .transform_service import TransformService, parse_transform_rule
+
+
+def mapping_dict(mapping: FieldMapping) -> Dict[str, Any]:
+    """字段映射转换为字典，转换规则保持数据库中的原始格式，由 compile_mappings 统一解析"""
+    return {
+        'id': mapping.id,
+        'channel_id': mapping.channel_id,
+        'internal_field': mapping.internal_field,
+        'channel_field': mapping.channel_field,
+        'field_type': mapping.field_type,
+        'is_required': mapping.is_required,
+        'transform_rule': mapping.transform_rule,
+        'description': mapping.description,
+    }
+
+
+class ChannelStateCache:
+    """
+    渠道热状态缓存：已加载的字段映射及预编译的转换规则。
+    缓存是进程内的，invalidate 只作用于当前进程；多 worker 部署时其他进程的变更
+    在 CHANNEL_STATE_TTL_SECONDS 后重新加载时生效。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states: Dict[int, Dict[str, Any]] = {}
+        self._versions: Dict[int, int] = {}
+
+    def version(self, channel_id: int) -> int:
+        """获取渠道映射版本号，每次在本进程内失效时递增"""
+        return self._versions.get(channel_id, 0)
+
+    def get(self, db: Session, channel_id: int) -> Dict[str, Any]:
+        """获取渠道状态，未缓存或已超过 TTL 时从数据库加载"""
+        state = self._states.get(channel_id)
+        if state is None or time.monotonic() - state['loaded_at'] >= settings.CHANNEL_STATE_TTL_SECONDS:
+            state = self.load(db, channel_id)
+        return state
+
+    def load(self, db: Session, channel_id: int) -> Dict[str, Any]:
+        """从数据库加载渠道映射并编译规则"""
+        version = self.version(channel_id)
+        mappings = db.query(FieldMapping).filter(
+            FieldMapping.channel_id == channel_id
+        ).order_by(FieldMapping.id).all()
+        state = {
+            'channel_id': channel_id,
+            'version': version,
+            'loaded_at': time.monotonic(),
+            # 每个映射版本只编译一次，请求中直接使用编译结果
+            'mappings': TransformService.compile_mappings([mapping_dict(mapping) for mapping in mappings]),
+        }
+        with self._lock:
+            # 加载期间映射被修改时不写入过期状态
+            if self.version(channel_id) == version:
+                self._states[channel_id] = state
+        return state
+
+    def invalidate(self, channel_id: int):
+        """映射变更后使渠道状态失效"""
+        with self._lock:
+            self._states.pop(channel_id, None)
+            self._versions[channel_id] = self.version(channel_id) + 1
+
+    def warm_up(self, db: Session, top_n: int) -> List[int]:
+        """预加载映射数量最多的前N个启用渠道"""
+        rows = db.query(FieldMapping.channel_id, func.count(FieldMapping.id).label('mapping_count')) \
+            .join(Channel, Channel.id == FieldMapping.channel_id) \
+            .filter(Channel.status == 'active') \
+            .group_by(FieldMapping.channel_id) \
+            .order_by(func.count(FieldMapping.id).desc()) \
+            .limit(top_n) \
+            .all()
+        channel_ids = [row.channel_id for row in rows]
+        for channel_id in channel_ids:
+            self.load(db, channel_id)
+        return channel_ids
+
+
+channel_state_cache = ChannelStateCache()
@@ -0,0 +1,210 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from ..core.config import settings
+from .transform_service import CompiledMappings, TransformService
+
+# 幂等方法在请求已发出后仍可重试；其余方法只在连接未建立时重试，避免重复下单
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {502, 503, 504}
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class DispatchError(Exception):
+    """转发失败，status_code 为返回给调用方的状态码"""
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class CircuitBreaker:
+    """
+    渠道熔断器：连续失败达到阈值后打开，冷却时间内直接拒绝请求；
+    冷却结束后放行一个试探请求（半开），成功则关闭，失败则重新打开。
+    """
+    __slots__ = ('threshold', 'reset_seconds', 'state', 'failures', 'opened_at', '_probing')
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release(self):
+        """请求未得出结果（如被取消）时释放试探名额，下一个请求可以重新试探"""
+        self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures}
+
+
+def split_mappings(mappings: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """按渠道字段拆分为请求映射和响应映射（渠道字段为 JSONPath 的视为响应映射），已编译的映射拆分后仍无需重复编译"""
+    container = CompiledMappings if isinstance(mappings, CompiledMappings) else list
+    request_mappings, response_mappings = container(), container()
+    for mapping in mappings:
+        channel_field = mapping.get('channel_field') or ''
+        (response_mappings if channel_field.startswith('$') else request_mappings).append(mapping)
+    return request_mappings, response_mappings
+
+
+class ChannelDispatcher:
+    """渠道请求转发：每个渠道一个长连接池，带重试退避与熔断；transport 用于替换底层传输（如测试桩）"""
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._transport = transport
+        self._clients: Dict[int, Tuple[str, httpx.AsyncClient]] = {}
+        self._breakers: Dict[int, CircuitBreaker] = {}
+
+    async def dispatch(self, channel: Any, mappings: List[Dict[str, Any]], method: str, path: str,
+                       data: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        转换请求并发送到渠道，再按响应映射转换渠道响应。
+        渠道返回 5xx 时抛出 502 的 DispatchError，detail 中包含渠道状态码与响应内容。
+        """
+        method = method.upper()
+        request_mappings, response_mappings = split_mappings(mappings)
+        try:
+            payload = TransformService.batch_transform(data, request_mappings)
+        except ValueError as e:
+            raise DispatchError(400, e.args[0])
+
+        breaker = self.breaker(channel.id)
+        if not breaker.allow():
+            raise DispatchError(503, f"Circuit open for channel {channel.id}")
+
+        response, attempts = None, 0
+        try:
+            client = await self._client(channel)
+            response, attempts = await self._send(client, method, path, payload, headers)
+        except httpx.HTTPError as e:
+            breaker.record_failure()
+            raise DispatchError(502, f"Channel request failed: {type(e).__name__}: {str(e)}")
+        except Exception:
+            breaker.record_failure()
+            raise
+        finally:
+            # 取消等未计入成败的情况，避免半开状态的试探名额一直被占用
+            if response is None:
+                breaker.release()
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+            raise DispatchError(502, {
+                "message": "Channel returned a server error",
+                "status_code": response.status_code,
+                "attempts": attempts,
+                "response": body,
+            })
+        breaker.record_success()
+        mapped, errors = TransformService.reverse_transform(body, response_mappings) \
+            if isinstance(body, dict) else ({}, [])
+
+        return {
+            "status_code": response.status_code,
+            "attempts": attempts,
+            "request": payload,
+            "response": body,
+            "data": mapped,
+            "errors": errors,
+        }
+
+    async def _send(self, client: httpx.AsyncClient, method: str, path: str,
+                    payload: Dict[str, Any], headers: Optional[Dict[str, str]]) -> Tuple[httpx.Response, int]:
+        idempotent = method in IDEMPOTENT_METHODS
+        max_attempts = settings.DISPATCH_MAX_RETRIES + 1
+        for attempt in range(1, max_attempts + 1):
+            try:
+                if method in ("GET", "HEAD", "DELETE"):
+                    response = await client.request(method, path, params=payload, headers=headers)
+                else:
+                    response = await client.request(method, path, json=payload, headers=headers)
+            except _NOT_SENT_ERRORS:
+                if attempt == max_attempts:
+                    raise
+            except httpx.TransportError:
+                if not idempotent or attempt == max_attempts:
+                    raise
+            else:
+                if not (idempotent and response.status_code in RETRY_STATUSES) or attempt == max_attempts:
+                    return response, attempt
+                await response.aclose()
+            await asyncio.sleep(_backoff(attempt))
+
+    async def _client(self, channel: Any) -> httpx.AsyncClient:
+        """获取渠道连接池，渠道地址变化时重建"""
+        cached = self._clients.get(channel.id)
+        if cached is not None and cached[0] == channel.api_base_url:
+            return cached[1]
+        client = httpx.AsyncClient(
+            base_url=channel.api_base_url,
+            transport=self._transport,
+            limits=httpx.Limits(
+                max_connections=settings.DISPATCH_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DISPATCH_MAX_KEEPALIVE,
+                keepalive_expiry=settings.DISPATCH_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.DISPATCH_TIMEOUT, connect=settings.DISPATCH_CONNECT_TIMEOUT),
+        )
+        self._clients[channel.id] = (channel.api_base_url, client)
+        if cached is not None:
+            await cached[1].aclose()
+        return client
+
+    def breaker(self, channel_id: int) -> CircuitBreaker:
+        breaker = self._breakers.get(channel_id)
+        if breaker is None:
+            breaker = self._breakers[channel_id] = CircuitBreaker(
+                settings.DISPATCH_BREAKER_THRESHOLD, settings.DISPATCH_BREAKER_RESET_SECONDS
+            )
+        return breaker
+
+    async def shutdown(self):
+        clients = [client for _, client in self._clients.values()]
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+def _backoff(attempt: int) -> float:
+    """指数退避，带随机抖动"""
+    delay = min(settings.DISPATCH_BACKOFF_MAX, settings.DISPATCH_BACKOFF_BASE * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+channel_dispatcher = ChannelDispatcher()
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Tuple
+from ..core.config import settings
+from ..core.database import SessionLocal
+from .doc_parser import APIDocumentParser
+from .field_catalog import FieldCatalog
+
+
+# 工作进程最近解码的文档 (摘要, {数据模型来源: 数据模型})
+_document: Tuple[Optional[str], Dict[str, Dict[str, Any]]] = (None, {})
+
+
+def _load_document(digest: str, content: bytes) -> Dict[str, Dict[str, Any]]:
+    """在工作进程中解码文档；同一进程缓存最近一份，后续批次不再重复解码"""
+    global _document
+    if _document[0] != digest:
+        try:
+            doc_content = json.loads(content)
+        except json.JSONDecodeError:
+            raise ValueError("Invalid API document format")
+        if not isinstance(doc_content, dict):
+            raise ValueError("Unsupported API document format")
+        _document = (digest, dict(APIDocumentParser().iter_schemas(doc_content)))
+    return _document[1]
+
+
+def outline_document(digest: str, content: bytes) -> Dict[str, str]:
+    """在工作进程中解码文档，按文档顺序返回各数据模型的结构哈希"""
+    schemas = _load_document(digest, content)
+    return {source: APIDocumentParser.schema_hash(schema) for source, schema in schemas.items()}
+
+
+def parse_document_sources(digest: str, content: bytes, sources: List[str]) -> FieldCatalog:
+    """在工作进程中解析文档的指定数据模型"""
+    schemas = _load_document(digest, content)
+    return parse_schema_batch([(source, schemas[source]) for source in sources])
+
+
+def parse_schema_batch(batch: List[Tuple[str, Dict[str, Any]]]) -> FieldCatalog:
+    """在工作进程中解析一批数据模型"""
+    fields = FieldCatalog()
+    for source, schema in batch:
+        APIDocumentParser.parse_schema(source, schema, fields)
+    return fields
+
+
+def diff_fields(previous: FieldCatalog, previous_sources: Dict[str, List[int]],
+                parsed: FieldCatalog, parsed_sources: Dict[str, List[int]],
+                sources: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """比较指定数据模型中新旧字段的差异"""
+    before = {}
+    after = {}
+    for source in sources:
+        for position in previous_sources.get(source, []):
+            field = previous.field(position)
+            before[(field["source"], field["name"])] = field
+        for position in parsed_sources.get(source, []):
+            field = parsed.field(position)
+            after[(field["source"], field["name"])] = field
+
+    return {
+        "added": [field for key, field in after.items() if key not in before],
+        "removed": [field for key, field in before.items() if key not in after],
+        "changed": [
+            {"name": key[1], "source": key[0], "before": before[key], "after": field}
+            for key, field in after.items() if key in before and before[key] != field
+        ],
+    }
+
+
+class DocParseJobManager:
+    """文档解析后台任务管理"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._runner: Optional[ThreadPoolExecutor] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, channel_id: int, content: bytes, content_type: Optional[str],
+               actor: str = "system") -> Dict[str, Any]:
+        """提交解析任务，立即返回任务信息"""
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "channel_id": channel_id,
+            "status": "pending",
+            "schemas_total": None,
+            "schemas_processed": 0,
+            "fields_found": 0,
+            "result": None,
+            "changes": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        with self._lock:
+            self._prune()
+            self._jobs[job["job_id"]] = job
+            if self._runner is None:
+                self._runner = ThreadPoolExecutor(
+                    max_workers=settings.DOC_PARSE_MAX_JOBS,
+                    thread_name_prefix="doc-parse"
+                )
+        self._runner.submit(self._run, job, content, content_type, actor)
+        return self._snapshot(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """查询任务进度与结果"""
+        job = self._jobs.get(job_id)
+        return self._snapshot(job) if job else None
+
+    def shutdown(self):
+        if self._runner is not None:
+            self._runner.shutdown(wait=False)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def _run(self, job: Dict[str, Any], content: bytes, content_type: Optional[str], actor: str):
+        from .channel_service import ChannelService
+
+        job["status"] = "running"
+        try:
+            # 文档的解码与解析都在工作进程中进行，API 进程只传递原始字节
+            digest = hashlib.sha1(content).hexdigest()
+            hashes = self._get_pool().submit(outline_document, digest, content).result()
+            job["schemas_total"] = len(hashes)
+
+            db = SessionLocal()
+            try:
+                channel_service = ChannelService(db, actor)
+                channel = channel_service.get_channel(job["channel_id"])
+                if not channel:
+                    raise ValueError("Channel not found")
+
+                # 与已保存版本按数据模型的结构哈希比较，只重新解析变更的模型
+                previous_config = channel.config or {}
+                previous_hashes = previous_config.get("schema_hashes", {})
+                previous = FieldCatalog(previous_config.get("parsed_fields", []))
+                previous_sources = previous.positions_by_source()
+
+                unchanged = {source for source, schema_hash in hashes.items()
+                             if previous_hashes.get(source) == schema_hash}
+                for source in unchanged:
+                    job["schemas_processed"] += 1
+                    job["fields_found"] += len(previous_sources.get(source, []))
+
+                parsed = self._parse_schemas(job, digest, content,
+                                             [source for source in hashes if source not in unchanged])
+                parsed_sources = parsed.positions_by_source()
+
+                fields = FieldCatalog()
+                for source in hashes:
+                    if source in unchanged:
+                        fields.extend(previous, previous_sources.get(source, []))
+                    else:
+                        fields.extend(parsed, parsed_sources.get(source, []))
+
+                known_sources = set(previous_sources) | set(previous_hashes)
+                changes = {
+                    "schemas": {
+                        "added": [source for source in hashes if source not in known_sources],
+                        "removed": [source for source in known_sources if source not in hashes],
+                        "changed": [source for source in hashes
+                                    if source in known_sources and source not in unchanged],
+                        "unchanged": len(unchanged),
+                    },
+                    "fields": diff_fields(
+                        previous, previous_sources, parsed, parsed_sources,
+                        [source for source in hashes if source not in unchanged] +
+                        [source for source in known_sources if source not in hashes]
+                    ),
+                }
+                touched = {field["name"] for kind in ("added", "removed", "changed")
+                           for field in changes["fields"][kind]}
+
+                channel_service.save_parsed_fields(job["channel_id"], fields, content_type, hashes)
+                # 字段已提交，重新验证失败只随结果报告，任务仍视为成功
+                changes["revalidated_mappings"] = None
+                changes["revalidation_error"] = None
+                try:
+                    changes["revalidated_mappings"] = channel_service.revalidate_mappings(
+                        job["channel_id"], touched, fields
+                    )
+                except Exception as e:
+                    db.rollback()
+                    print(f"Doc parse job {job['job_id']} revalidation failed: {str(e)}")
+                    changes["revalidation_error"] = str(e)
+            finally:
+                db.close()
+
+            job["result"] = fields
+            job["changes"] = changes
+            job["status"] = "succeeded"
+        except Exception as e:
+            print(f"Doc parse job {job['job_id']} failed: {str(e)}")
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+
+    def _parse_schemas(self, job: Dict[str, Any], digest: str, content: bytes, sources: List[str]) -> FieldCatalog:
+        # 每个批次都要携带整份文档，批次数不超过工作进程数；同一进程只需解码一次
+        size = max(1, settings.DOC_PARSE_BATCH_SIZE, -(-len(sources) // max(1, settings.DOC_PARSE_WORKERS)))
+        batches = [sources[i:i + size] for i in range(0, len(sources), size)]
+        results: List[Optional[FieldCatalog]] = [None for _ in batches]
+
+        pool = self._get_pool()
+        futures = {pool.submit(parse_document_sources, digest, content, batch): index
+                   for index, batch in enumerate(batches)}
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            job["schemas_processed"] += len(batches[index])
+            job["fields_found"] += len(results[index])
+
+        # 保持与文档中模型顺序一致
+        fields = FieldCatalog()
+        for batch_fields in results:
+            fields.extend(batch_fields)
+        return fields
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # 不用 fork：API 进程中的线程、连接池和锁不应被复制到工作进程
+                self._pool = ProcessPoolExecutor(
+                    max_workers=settings.DOC_PARSE_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _prune(self):
+        """清理已过期的已完成任务"""
+        expire_before = time.time() - settings.DOC_JOB_TTL_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job["finished_at"] and job["finished_at"] < expire_before]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+        snapshot = dict(job)
+        if isinstance(snapshot["result"], FieldCatalog):
+            snapshot["result"] = snapshot["result"].to_dicts()
+        return snapshot
+
+
+doc_parse_jobs = DocParseJobManager()
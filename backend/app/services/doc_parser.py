@@ -1,8 +1,10 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+import hashlib
 import json
+from .field_catalog import FieldCatalog
 
 class APIDocumentParser:
-    def parse(self, doc_content: Dict) -> List[Dict[str, Any]]:
+    def parse(self, doc_content: Dict) -> FieldCatalog:
         """解析API文档，支持Swagger和OpenAPI格式"""
         if self._is_swagger(doc_content):
             return self._parse_swagger(doc_content)
@@ -19,46 +21,68 @@ class APIDocumentParser:
         """检查是否为OpenAPI格式"""
         return 'openapi' in doc_content and doc_content['openapi'].startswith('3')
 
-    def _parse_swagger(self, doc_content: Dict) -> List[Dict[str, Any]]:
+    def _parse_swagger(self, doc_content: Dict) -> FieldCatalog:
         """解析Swagger格式文档"""
-        fields = []
+        fields = FieldCatalog()
         
         # 解析定义
-        definitions = doc_content.get('definitions', {})
-        for def_name, def_schema in definitions.items():
-            if 'properties' in def_schema:
-                for prop_name, prop_schema in def_schema['properties'].items():
-                    fields.append({
-                        'name': prop_name,
-                        'type': prop_schema.get('type', 'string'),
-                        'required': prop_name in def_schema.get('required', []),
-                        'description': prop_schema.get('description', ''),
-                        'source': f'definitions.{def_name}'
-                    })
+        for source, schema in self.iter_schemas(doc_content):
+            self.parse_schema(source, schema, fields)
         
         return fields
 
-    def _parse_openapi(self, doc_content: Dict) -> List[Dict[str, Any]]:
+    def _parse_openapi(self, doc_content: Dict) -> FieldCatalog:
         """解析OpenAPI格式文档"""
-        fields = []
+        fields = FieldCatalog()
         
         # 解析组件
-        components = doc_content.get('components', {})
-        schemas = components.get('schemas', {})
-        
-        for schema_name, schema in schemas.items():
-            if 'properties' in schema:
-                for prop_name, prop_schema in schema['properties'].items():
-                    fields.append({
-                        'name': prop_name,
-                        'type': prop_schema.get('type', 'string'),
-                        'required': prop_name in schema.get('required', []),
-                        'description': prop_schema.get('description', ''),
-                        'source': f'components.schemas.{schema_name}'
-                    })
+        for source, schema in self.iter_schemas(doc_content):
+            self.parse_schema(source, schema, fields)
         
         return fields
 
+    def iter_schemas(self, doc_content: Dict) -> List[Tuple[str, Dict[str, Any]]]:
+        """列出文档中的全部数据模型及其来源"""
+        if self._is_swagger(doc_content):
+            definitions = doc_content.get('definitions', {})
+            return [(f'definitions.{name}', schema) for name, schema in definitions.items()]
+        elif self._is_openapi(doc_content):
+            schemas = doc_content.get('components', {}).get('schemas', {})
+            return [(f'components.schemas.{name}', schema) for name, schema in schemas.items()]
+        else:
+            raise ValueError("Unsupported API document format")
+
+    @staticmethod
+    def schema_hash(schema: Dict[str, Any]) -> str:
+        """数据模型的结构哈希，只包含影响解析结果的部分"""
+        structure = {
+            'properties': {
+                prop_name: [prop_schema.get('type', 'string'), prop_schema.get('description', '')]
+                for prop_name, prop_schema in schema.get('properties', {}).items()
+            },
+            'required': sorted(schema.get('required', [])),
+        }
+        return hashlib.sha1(
+            json.dumps(structure, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+
+    @staticmethod
+    def parse_schema(source: str, schema: Dict[str, Any], fields: Optional[FieldCatalog] = None) -> FieldCatalog:
+        """解析单个数据模型的属性，追加到字段目录中"""
+        if fields is None:
+            fields = FieldCatalog()
+        if 'properties' in schema:
+            required = schema.get('required', [])
+            for prop_name, prop_schema in schema['properties'].items():
+                fields.append(
+                    prop_name,
+                    prop_schema.get('type', 'string'),
+                    prop_name in required,
+                    prop_schema.get('description', ''),
+                    source
+                )
+        return fields
+
     def extract_endpoints(self, doc_content: Dict) -> List[Dict[str, Any]]:
         """提取API端点信息"""
         endpoints = []
@@ -0,0 +1,122 @@
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+class FieldCatalog:
+    """
+    解析字段的紧凑存储：按列保存的并行数组，重复字符串（类型、来源、描述、字段名）
+    在目录内只保留一份，并按字段名建立索引。可转换为接口返回的字典列表。
+    """
+    __slots__ = ('_names', '_types', '_required', '_descriptions', '_sources',
+                 '_type_values', '_source_values', '_type_ids', '_source_ids', '_pool', '_index')
+
+    def __init__(self, fields: Optional[Iterable[Dict[str, Any]]] = None):
+        self._names: List[str] = []
+        self._types = array('H')
+        self._required = bytearray()
+        self._descriptions: List[str] = []
+        self._sources = array('I')
+        self._type_values: List[str] = []
+        self._source_values: List[str] = []
+        self._type_ids: Dict[str, int] = {}
+        self._source_ids: Dict[str, int] = {}
+        self._pool: Dict[str, str] = {}
+        self._index: Dict[str, int] = {}
+        for field in fields or ():
+            self.append(
+                field['name'],
+                field.get('type', 'string'),
+                field.get('required', False),
+                field.get('description', ''),
+                field.get('source', '')
+            )
+
+    def append(self, name: str, type: str, required: bool, description: str, source: str):
+        """追加一个字段"""
+        position = len(self._names)
+        if isinstance(type, list):
+            type = tuple(type)
+        name = self._intern(name)
+        self._names.append(name)
+        self._types.append(self._value_id(self._type_ids, self._type_values, type))
+        self._required.append(1 if required else 0)
+        self._descriptions.append(self._intern(description or ''))
+        self._sources.append(self._value_id(self._source_ids, self._source_values, source))
+        # 同名字段以最后出现的为准，与按名称构建字典的行为一致
+        self._index[name] = position
+
+    def extend(self, other: 'FieldCatalog', positions: Optional[Iterable[int]] = None):
+        """合并另一个目录，可只合并指定位置的字段"""
+        for position in range(len(other)) if positions is None else positions:
+            self.append(
+                other._names[position],
+                other._type_values[other._types[position]],
+                bool(other._required[position]),
+                other._descriptions[position],
+                other._source_values[other._sources[position]]
+            )
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """按字段名查找"""
+        position = self._index.get(name)
+        return None if position is None else self.field(position)
+
+    def field(self, position: int) -> Dict[str, Any]:
+        return {
+            'name': self._names[position],
+            'type': self._type_values[self._types[position]],
+            'required': bool(self._required[position]),
+            'description': self._descriptions[position],
+            'source': self._source_values[self._sources[position]],
+        }
+
+    def positions_by_source(self) -> Dict[str, List[int]]:
+        """按来源（数据模型）分组的字段位置"""
+        groups: Dict[str, List[int]] = {}
+        for position, source_id in enumerate(self._sources):
+            groups.setdefault(self._source_values[source_id], []).append(position)
+        return groups
+
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """转换为接口返回的字典列表"""
+        return [self.field(position) for position in range(len(self._names))]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for position in range(len(self._names)):
+            yield self.field(position)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __getstate__(self):
+        # 驻留池和索引可以重建，不参与序列化
+        return (self._names, self._types, self._required, self._descriptions,
+                self._sources, self._type_values, self._source_values)
+
+    def __setstate__(self, state):
+        (self._names, self._types, self._required, self._descriptions,
+         self._sources, self._type_values, self._source_values) = state
+        self._type_ids = {value: value_id for value_id, value in enumerate(self._type_values)}
+        self._source_ids = {value: value_id for value_id, value in enumerate(self._source_values)}
+        self._pool = {}
+        self._names = [self._intern(name) for name in self._names]
+        self._descriptions = [self._intern(description) for description in self._descriptions]
+        self._index = {name: position for position, name in enumerate(self._names)}
+
+    def _intern(self, value: str) -> str:
+        return self._pool.setdefault(value, value)
+
+    @staticmethod
+    def _value_id(ids: Dict[str, int], values: List[str], value: str) -> int:
+        # 类型和来源的取值种类很少，使用编号代替重复的字符串引用
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(values)
+            values.append(value)
+        return value_id
@@ -0,0 +1,235 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.channel import Channel, FieldMapping
+
+_CAMEL_RE = re.compile(r'([a-z0-9])([A-Z])')
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+_TOKEN_RE = re.compile(r'[a-z0-9]+|[一-鿿]+')
+
+# 名称相似度与描述相似度的权重
+NAME_WEIGHT = 0.8
+DESCRIPTION_WEIGHT = 0.2
+
+
+def normalize_field_name(name: str) -> str:
+    """规范化字段名：取JSONPath最后一段，驼峰转下划线并转小写"""
+    name = (name or '').split('.')[-1]
+    name = _CAMEL_RE.sub(r'\1_\2', name).lower()
+    return _NON_WORD_RE.sub('_', name).strip('_')
+
+
+def name_trigrams(name: str) -> Set[str]:
+    """生成字段名的字符三元组"""
+    padded = f"  {normalize_field_name(name)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def text_tokens(text: str) -> Set[str]:
+    """描述分词：英文按单词，中文按相邻双字"""
+    tokens = set()
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        if token[0] >= '一' and len(token) > 1:
+            tokens.update(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            tokens.add(token)
+    return tokens
+
+
+class _Document:
+    """同一个渠道字段名到同一个内部字段的映射证据"""
+    __slots__ = ('internal_field', 'trigrams', 'tokens', 'channels', 'support')
+
+    def __init__(self, internal_field: str, trigrams: Set[str]):
+        self.internal_field = internal_field
+        self.trigrams = trigrams
+        self.tokens: Counter = Counter()
+        self.channels: Counter = Counter()
+        # 各渠道采用次数之和，建索引时维护，推荐时无需逐个渠道累加
+        self.support = 0
+
+
+class MappingRecommender:
+    """基于倒排索引的字段映射推荐"""
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._documents: Dict[Tuple[str, str], _Document] = {}
+        self._trigram_index: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._token_index: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._channel_entries: Dict[int, List[Tuple[Tuple[str, str], Set[str]]]] = {}
+
+    def build(self, db: Session):
+        """从数据库全量构建索引"""
+        channels = db.query(Channel.id, Channel.config).all()
+        descriptions = {channel_id: _field_descriptions(config) for channel_id, config in channels}
+        mappings_by_channel: Dict[int, List[FieldMapping]] = defaultdict(list)
+        for mapping in db.query(FieldMapping).all():
+            mappings_by_channel[mapping.channel_id].append(mapping)
+
+        with self._lock:
+            self._documents.clear()
+            self._trigram_index.clear()
+            self._token_index.clear()
+            self._channel_entries.clear()
+            for channel_id, mappings in mappings_by_channel.items():
+                self._add_channel(channel_id, mappings, descriptions.get(channel_id, {}))
+            self._built = True
+
+    def ensure_built(self, db: Session):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build(db)
+
+    def update_channel(self, channel_id: int, mappings: Iterable[Any], parsed_fields: List[Dict[str, Any]]):
+        """渠道映射保存后增量更新索引"""
+        with self._lock:
+            if not self._built:
+                return
+            self._remove_channel(channel_id)
+            self._add_channel(channel_id, mappings, {
+                field['name']: field.get('description', '') for field in parsed_fields or []
+            })
+
+    def remove_channel(self, channel_id: int):
+        """渠道映射删除后从索引中移除"""
+        with self._lock:
+            if self._built:
+                self._remove_channel(channel_id)
+
+    def suggest(self, db: Session, field: Dict[str, Any], limit: int = 5,
+                min_score: float = 0.2, exclude_channel_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """为单个渠道字段推荐内部字段"""
+        self.ensure_built(db)
+        trigrams = name_trigrams(field.get('name', ''))
+        tokens = text_tokens(field.get('description', ''))
+
+        with self._lock:
+            # Counter.update 对可迭代对象的计数在 C 中完成
+            shared_trigrams: Counter = Counter()
+            for trigram in trigrams:
+                shared_trigrams.update(self._trigram_index.get(trigram, ()))
+            shared_tokens: Counter = Counter()
+            for token in tokens:
+                shared_tokens.update(self._token_index.get(token, ()))
+
+            # 只为共享字符三元组（其次为描述词）最多的文档计算得分
+            keys = heapq.nlargest(
+                settings.RECOMMEND_MAX_CANDIDATES,
+                set(shared_trigrams) | set(shared_tokens),
+                key=lambda key: (shared_trigrams.get(key, 0), shared_tokens.get(key, 0))
+            )
+            candidates: Dict[str, Dict[str, Any]] = {}
+            for key in keys:
+                document = self._documents[key]
+                support = document.support - document.channels.get(exclude_channel_id, 0)
+                if support <= 0:
+                    continue
+
+                name_score = _jaccard(shared_trigrams.get(key, 0), len(trigrams), len(document.trigrams))
+                description_score = _jaccard(shared_tokens.get(key, 0), len(tokens), len(document.tokens))
+                score = NAME_WEIGHT * name_score + DESCRIPTION_WEIGHT * description_score
+                # 被更多渠道采用的映射略微加分
+                score = min(1.0, score * (1 + 0.05 * math.log1p(support)))
+
+                best = candidates.get(document.internal_field)
+                if best is None or score > best['score']:
+                    candidates[document.internal_field] = {
+                        'internal_field': document.internal_field,
+                        'score': round(score, 4),
+                        'support': support,
+                    }
+
+        ranked = sorted(
+            (c for c in candidates.values() if c['score'] >= min_score),
+            key=lambda c: (-c['score'], -c['support'], c['internal_field'])
+        )
+        return ranked[:limit]
+
+    def _add_channel(self, channel_id: int, mappings: Iterable[Any], descriptions: Dict[str, str]):
+        entries = []
+        for mapping in mappings:
+            internal_field = _get(mapping, 'internal_field')
+            channel_field = _get(mapping, 'channel_field')
+            if not internal_field or not channel_field:
+                continue
+
+            key = (normalize_field_name(channel_field), internal_field)
+            document = self._documents.get(key)
+            if document is None:
+                document = _Document(internal_field, name_trigrams(channel_field))
+                self._documents[key] = document
+                for trigram in document.trigrams:
+                    self._trigram_index[trigram].add(key)
+
+            tokens = text_tokens(' '.join(filter(None, [
+                _get(mapping, 'description'),
+                descriptions.get(channel_field) or descriptions.get(channel_field.split('.')[-1]),
+            ])))
+            for token in tokens:
+                if document.tokens[token] == 0:
+                    self._token_index[token].add(key)
+                document.tokens[token] += 1
+            document.channels[channel_id] += 1
+            document.support += 1
+            entries.append((key, tokens))
+        self._channel_entries[channel_id] = entries
+
+    def _remove_channel(self, channel_id: int):
+        for key, tokens in self._channel_entries.pop(channel_id, []):
+            document = self._documents.get(key)
+            if document is None:
+                continue
+            for token in tokens:
+                document.tokens[token] -= 1
+                if document.tokens[token] <= 0:
+                    del document.tokens[token]
+                    self._discard(self._token_index, token, key)
+            document.channels[channel_id] -= 1
+            document.support -= 1
+            if document.channels[channel_id] <= 0:
+                del document.channels[channel_id]
+            if not document.channels:
+                del self._documents[key]
+                for trigram in document.trigrams:
+                    self._discard(self._trigram_index, trigram, key)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[Tuple[str, str]]], term: str, key: Tuple[str, str]):
+        postings = index.get(term)
+        if postings is not None:
+            postings.discard(key)
+            if not postings:
+                del index[term]
+
+
+def _jaccard(shared: int, left: int, right: int) -> float:
+    if not shared:
+        return 0.0
+    return shared / (left + right - shared)
+
+
+def _get(mapping: Any, name: str) -> Any:
+    """兼容ORM对象、映射字典以及 mapping_rules 结构"""
+    if isinstance(mapping, dict):
+        if name in mapping:
+            return mapping[name]
+        return (mapping.get('mapping_rules') or {}).get(name)
+    return getattr(mapping, name, None)
+
+
+def _field_descriptions(config: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    return {
+        field['name']: field.get('description', '')
+        for field in (config or {}).get('parsed_fields', [])
+        if field.get('name')
+    }
+
+
+mapping_recommender = MappingRecommender()
@@ -0,0 +1,273 @@
+import re
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+from ..core.config import settings
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+    from re import _compiler as sre_compile
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+    import sre_compile
+
+_DEFAULT_FLAGS = re.compile('').flags
+_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+_POSSESSIVE_REPEAT = getattr(sre_constants, 'POSSESSIVE_REPEAT', None)
+_SINGLE_CHAR_OPS = (sre_constants.LITERAL, sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN)
+# 判断字符集是否重叠时使用的样本字符：Latin-1 及几个常见的非 ASCII 字符
+_SAMPLE_CHARS = [chr(code) for code in range(256)] + ['\u3000', '\u4e2d', '\uff10', '\u2028']
+_ADJACENT_PROBLEM = "相邻的无上限量词可匹配相同字符（如 \\s*.*=、(.*a){12}）可能导致灾难性回溯"
+
+
+@lru_cache(maxsize=settings.REGEX_CACHE_SIZE)
+def compile_regex(pattern: str):
+    """编译并缓存正则表达式，缓存大小由 REGEX_CACHE_SIZE 控制"""
+    return re.compile(pattern)
+
+
+def check_pattern(pattern: str) -> List[str]:
+    """检查正则表达式的复杂度，返回可能导致灾难性回溯的问题"""
+    if not isinstance(pattern, str) or not pattern:
+        return ["未指定正则表达式"]
+    if len(pattern) > settings.REGEX_MAX_LENGTH:
+        return [f"正则表达式过长: {len(pattern)} > {settings.REGEX_MAX_LENGTH}"]
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error as e:
+        return [f"正则表达式语法错误: {str(e)}"]
+
+    problems = []
+    _walk(parsed, 0, problems)
+    _walk_sequences(parsed, parsed.state, False, problems)
+    return sorted(set(problems))
+
+
+def _walk(items, unbounded_depth: int, problems: List[str]):
+    """遍历语法树，unbounded_depth 为外层无上限量词的层数"""
+    for op, av in items:
+        if op in _REPEATS or op == _POSSESSIVE_REPEAT:
+            low, high, sub = av
+            unbounded = high == sre_constants.MAXREPEAT or high > 1000
+            if unbounded and op != _POSSESSIVE_REPEAT:
+                if unbounded_depth:
+                    problems.append("嵌套的无上限量词（如 (a+)+）可能导致灾难性回溯")
+                if _has_overlapping_branch(sub):
+                    problems.append("量词作用于可重叠的分支（如 (a|a)*）可能导致灾难性回溯")
+                _walk(sub, unbounded_depth + 1, problems)
+            else:
+                _walk(sub, unbounded_depth, problems)
+        elif op == sre_constants.SUBPATTERN:
+            _walk(av[-1], unbounded_depth, problems)
+        elif op == sre_constants.BRANCH:
+            for branch in av[1]:
+                _walk(branch, unbounded_depth, problems)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _walk(av[1], unbounded_depth, problems)
+        elif op == sre_constants.GROUPREF and unbounded_depth:
+            problems.append("量词内的反向引用可能导致灾难性回溯")
+        elif op == sre_constants.GROUPREF_EXISTS:
+            # (?(1)yes|no)：依次检查两个分支
+            for branch in av[1:]:
+                if branch:
+                    _walk(branch, unbounded_depth, problems)
+
+
+def _walk_sequences(items, state, followed: bool, problems: List[str]):
+    """
+    检查每个序列中相邻的无上限量词：两个量词能匹配相同字符且之后还有可能失败的内容时，
+    匹配失败需要尝试两者之间所有的分配方式，多组相邻时耗时按输入长度的幂次增长。
+    followed 表示序列之后是否还有内容。
+    """
+    if _has_adjacent_overlap(_tokens(items, state), followed):
+        problems.append(_ADJACENT_PROBLEM)
+    for index, (op, av) in enumerate(items):
+        rest = followed or index < len(items) - 1
+        if op in _REPEATS or op == _POSSESSIVE_REPEAT:
+            low, high, sub = av
+            if high > 1 and _char_set(sub, state) is None:
+                # 重复多次相当于重复体首尾相接，有上限的外层量词同样会放大内层的回溯
+                if _has_adjacent_overlap(_tokens(list(sub) * 2, state), True):
+                    problems.append(_ADJACENT_PROBLEM)
+                _walk_sequences(sub, state, True, problems)
+            else:
+                _walk_sequences(sub, state, rest, problems)
+        elif op == sre_constants.SUBPATTERN:
+            _walk_sequences(av[-1], state, rest, problems)
+        elif op == sre_constants.BRANCH:
+            for branch in av[1]:
+                _walk_sequences(branch, state, rest, problems)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            _walk_sequences(av[1], state, True, problems)
+        elif op == sre_constants.GROUPREF_EXISTS:
+            for branch in av[1:]:
+                if branch:
+                    _walk_sequences(branch, state, rest, problems)
+
+
+def _tokens(items, state) -> List[Tuple[str, Any, int]]:
+    """把序列展开为 (类型, 字符集, 最少次数)：rep 为单字符的无上限量词，char 为单字符，其余为 barrier"""
+    tokens = []
+    for op, av in items:
+        if op == sre_constants.SUBPATTERN:
+            tokens.extend(_tokens(av[-1], state))
+        elif op in _REPEATS:
+            low, high, sub = av
+            chars = _char_set(sub, state)
+            if chars is None:
+                tokens.append(('barrier', None, low))
+            else:
+                unbounded = high == sre_constants.MAXREPEAT or high > 1000
+                tokens.append(('rep' if unbounded else 'char', chars, low))
+        elif op == sre_constants.AT:
+            # 锚点不消耗字符
+            tokens.append(('char', frozenset(), 0))
+        else:
+            chars = _char_set([(op, av)], state)
+            tokens.append(('barrier', None, 1) if chars is None else ('char', chars, 1))
+    return tokens
+
+
+def _has_adjacent_overlap(tokens: List[Tuple[str, Any, int]], followed: bool) -> bool:
+    """是否存在两个无上限量词，字符集重叠且两者之间的内容都可被前一个量词吸收"""
+    for i, (kind, chars, _) in enumerate(tokens):
+        if kind != 'rep':
+            continue
+        for j in range(i + 1, len(tokens)):
+            next_kind, next_chars, next_low = tokens[j]
+            if next_kind == 'barrier':
+                break
+            if next_kind == 'rep' and chars & next_chars:
+                if followed or j < len(tokens) - 1:
+                    return True
+                break
+            # 可省略或可被前一个量词吸收的内容不会隔开两个量词
+            if next_low and not next_chars <= chars:
+                break
+    return False
+
+
+def _char_set(items, state) -> Optional[frozenset]:
+    """只匹配单个字符的语法片段能匹配的样本字符，其他片段返回 None"""
+    items = list(items)
+    if len(items) != 1:
+        return None
+    op, av = items[0]
+    if op == sre_constants.SUBPATTERN:
+        return _char_set(av[-1], state)
+    if op not in _SINGLE_CHAR_OPS:
+        return None
+    try:
+        compiled = sre_compile.compile(sre_parse.SubPattern(state, [(op, av)]))
+    except Exception:
+        return None
+    return frozenset(char for char in _SAMPLE_CHARS if compiled.fullmatch(char))
+
+
+def _has_overlapping_branch(items) -> bool:
+    """分支之间是否可能匹配相同的开头（按字面前缀粗略判断）"""
+    for op, av in items:
+        if op == sre_constants.SUBPATTERN and _has_overlapping_branch(av[-1]):
+            return True
+        if op == sre_constants.BRANCH:
+            prefixes = [_literal_prefix(branch) for branch in av[1]]
+            # 以非字面字符开头的分支超过一个
+            if prefixes.count(None) > 1:
+                return True
+            # 一个分支的字面前缀是另一个的前缀（含提取公共前缀后的空分支）
+            prefixes = [prefix for prefix in prefixes if prefix is not None]
+            for i, left in enumerate(prefixes):
+                for right in prefixes[i + 1:]:
+                    if left[:len(right)] == right[:len(left)]:
+                        return True
+    return False
+
+
+def _literal_prefix(items) -> Optional[Tuple[int, ...]]:
+    """分支开头连续的字面字符，以非字面字符开头时返回 None"""
+    prefix = []
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            prefix.append(av)
+        elif op == sre_constants.SUBPATTERN:
+            rest = _literal_prefix(av[-1])
+            if rest is None:
+                break
+            return tuple(prefix) + rest
+        else:
+            break
+    else:
+        return tuple(prefix)
+    return tuple(prefix) if prefix else None
+
+
+def combinable(pattern: str) -> bool:
+    """能否合并进多模式正则：不含命名分组、反向引用、条件分组引用和全局内联标志"""
+    try:
+        compiled = compile_regex(pattern)
+    except re.error:
+        return False
+    if compiled.groupindex or compiled.flags != _DEFAULT_FLAGS:
+        return False
+    # 合并后分组序号会偏移，按序号引用分组的正则不能合并
+    return not _references_groups(sre_parse.parse(pattern))
+
+
+def _references_groups(items) -> bool:
+    """语法树中是否含反向引用或条件分组引用（如 (?(1)b|c)）"""
+    for op, av in items:
+        if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            return True
+        if op in _REPEATS or op == _POSSESSIVE_REPEAT:
+            children = [av[2]]
+        elif op == sre_constants.SUBPATTERN:
+            children = [av[-1]]
+        elif op == sre_constants.BRANCH:
+            children = av[1]
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            children = [av[1]]
+        else:
+            children = []
+        if any(_references_groups(child) for child in children):
+            return True
+    return False
+
+
+class RegexGroup:
+    """
+    同一输入上的多条正则提取规则合并为一个正则，一次匹配得到所有规则的结果。
+    每条规则包装在独立的前瞻断言中，结果与分别调用 re.search 一致。
+    """
+    __slots__ = ('patterns', 'compiled', 'offsets', '_last')
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = patterns
+        self.compiled = re.compile(''.join(
+            f'(?:(?=(?s:.*?)(?P<_r{index}>{pattern}))|)' for index, pattern in enumerate(patterns)
+        ))
+        self.offsets = [self.compiled.groupindex[f'_r{index}'] for index in range(len(patterns))]
+        self._last: Tuple[Optional[str], Any] = (None, None)
+
+    def match(self, text: str):
+        # 同一输入只匹配一次；结果只取决于输入文本，并发下复用也是正确的
+        last_text, last_match = self._last
+        if last_text is text or last_text == text:
+            return last_match
+        match = self.compiled.match(text)
+        self._last = (text, match)
+        return match
+
+    def extract(self, index: int, value: Any, group: Any = 0) -> Tuple[bool, Any]:
+        """返回第 index 条规则的 (是否匹配, 分组值)"""
+        if not isinstance(group, int):
+            matches = compile_regex(self.patterns[index]).search(str(value))
+            return (False, None) if not matches else (True, matches.group(group))
+
+        match = self.match(str(value))
+        offset = self.offsets[index]
+        if match.start(offset) < 0:
+            return False, None
+        if group < 0 or group > compile_regex(self.patterns[index]).groups:
+            raise IndexError("no such group")
+        return True, match.group(offset + group)
@@ -0,0 +1,256 @@
+import json
+import multiprocessing
+import os
+import threading
+from collections import Counter
+import time
+import uuid
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.channel import ChannelSample
+from .transform_service import TransformService, parse_transform_rule
+
+_MISSING = object()
+
+
+def _run_mappings(payload: Dict[str, Any], mappings: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[str]]:
+    result = {}
+    errors = []
+    for mapping in mappings:
+        TransformService._apply_mapping(payload, mapping, result, errors)
+    return result, errors
+
+
+def replay_chunk(old_mappings: List[Dict[str, Any]], new_mappings: List[Dict[str, Any]],
+                 samples: List[Tuple[int, Dict[str, Any]]], max_examples: int) -> Dict[str, Any]:
+    """在工作进程中用新旧两套映射转换一批样本，并按字段汇总差异"""
+    old_mappings = TransformService.compile_mappings(old_mappings)
+    new_mappings = TransformService.compile_mappings(new_mappings)
+    report = _empty_report()
+
+    for sample_id, payload in samples:
+        old_result, old_errors = _run_mappings(payload, old_mappings)
+        new_result, new_errors = _run_mappings(payload, new_mappings)
+
+        report["samples"] += 1
+        report["old_error_samples"] += bool(old_errors)
+        report["new_error_samples"] += bool(new_errors)
+        changed = False
+        if old_errors != new_errors:
+            changed = True
+            if len(report["error_examples"]) < max_examples:
+                report["error_examples"].append({
+                    "sample_id": sample_id, "old": old_errors, "new": new_errors
+                })
+
+        for field in old_result.keys() | new_result.keys():
+            old_value = old_result.get(field, _MISSING)
+            new_value = new_result.get(field, _MISSING)
+            if old_value == new_value:
+                continue
+            changed = True
+            kind = "added" if old_value is _MISSING else "removed" if new_value is _MISSING else "changed"
+            stats = report["fields"].setdefault(field, {"added": 0, "removed": 0, "changed": 0, "examples": []})
+            stats[kind] += 1
+            if len(stats["examples"]) < max_examples:
+                stats["examples"].append({
+                    "sample_id": sample_id,
+                    "old": None if old_value is _MISSING else old_value,
+                    "new": None if new_value is _MISSING else new_value,
+                })
+        report["samples_changed"] += changed
+
+    return report
+
+
+def _empty_report() -> Dict[str, Any]:
+    return {
+        "samples": 0,
+        "samples_changed": 0,
+        "old_error_samples": 0,
+        "new_error_samples": 0,
+        "fields": {},
+        "error_examples": [],
+    }
+
+
+def _merge_report(report: Dict[str, Any], part: Dict[str, Any], max_examples: int):
+    for key in ("samples", "samples_changed", "old_error_samples", "new_error_samples"):
+        report[key] += part[key]
+    report["error_examples"].extend(part["error_examples"][:max_examples - len(report["error_examples"])])
+    for field, stats in part["fields"].items():
+        total = report["fields"].setdefault(field, {"added": 0, "removed": 0, "changed": 0, "examples": []})
+        for kind in ("added", "removed", "changed"):
+            total[kind] += stats[kind]
+        total["examples"].extend(stats["examples"][:max_examples - len(total["examples"])])
+
+
+class ReplayJobManager:
+    """样本语料回放任务管理：并行比较新旧映射的转换结果"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._runner: Optional[ThreadPoolExecutor] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, channel_id: int, old_mappings: List[Dict[str, Any]],
+               new_mappings: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """提交回放任务，立即返回任务信息"""
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "channel_id": channel_id,
+            "status": "pending",
+            "samples_processed": 0,
+            "report": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        with self._lock:
+            self._prune()
+            self._jobs[job["job_id"]] = job
+            if self._runner is None:
+                self._runner = ThreadPoolExecutor(
+                    max_workers=settings.REPLAY_MAX_JOBS,
+                    thread_name_prefix="replay"
+                )
+        old_mappings, new_mappings, job["mappings_unchanged"] = changed_subsets(
+            _portable(old_mappings), _portable(new_mappings)
+        )
+        job["mappings_replayed"] = {"old": len(old_mappings), "new": len(new_mappings)}
+        self._runner.submit(self._run, job, old_mappings, new_mappings)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def shutdown(self):
+        if self._runner is not None:
+            self._runner.shutdown(wait=False)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def _run(self, job: Dict[str, Any], old_mappings: List[Dict[str, Any]], new_mappings: List[Dict[str, Any]]):
+        job["status"] = "running"
+        started = time.perf_counter()
+        max_examples = settings.REPLAY_MAX_EXAMPLES
+        report = _empty_report()
+        pool = self._get_pool()
+        # 限制在途分片数量，避免一次性把整个语料读入内存
+        max_pending = 2 * _worker_count()
+        pending = set()
+
+        def collect(return_when):
+            nonlocal pending
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                part = future.result()
+                _merge_report(report, part, max_examples)
+                job["samples_processed"] += part["samples"]
+
+        db = SessionLocal()
+        try:
+            last_id = 0
+            if not old_mappings and not new_mappings:
+                # 映射没有变化，无需逐条回放
+                report["samples"] = job["samples_processed"] = db.query(ChannelSample).filter(
+                    ChannelSample.channel_id == job["channel_id"]
+                ).count()
+                last_id = None
+            while last_id is not None:
+                rows = db.query(ChannelSample.id, ChannelSample.payload).filter(
+                    ChannelSample.channel_id == job["channel_id"],
+                    ChannelSample.id > last_id
+                ).order_by(ChannelSample.id).limit(settings.REPLAY_CHUNK_SIZE).all()
+                if not rows:
+                    break
+                last_id = rows[-1].id
+                pending.add(pool.submit(
+                    replay_chunk, old_mappings, new_mappings,
+                    [(row.id, row.payload) for row in rows], max_examples
+                ))
+                if len(pending) >= max_pending:
+                    collect(FIRST_COMPLETED)
+            collect(ALL_COMPLETED)
+
+            report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+            job["report"] = report
+            job["status"] = "succeeded"
+        except Exception as e:
+            print(f"Replay job {job['job_id']} failed: {str(e)}")
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            db.close()
+            job["finished_at"] = time.time()
+
+    def _prune(self):
+        """清理已过期的已完成任务"""
+        expire_before = time.time() - settings.REPLAY_JOB_TTL_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job["finished_at"] and job["finished_at"] < expire_before]:
+            del self._jobs[job_id]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # 与文档解析相同，不用 fork 复制 API 进程中的数据库连接、线程和锁
+                self._pool = ProcessPoolExecutor(
+                    max_workers=_worker_count(),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+
+def changed_subsets(old_mappings: List[Dict[str, Any]],
+                    new_mappings: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+    """
+    两套映射中完全相同的映射对同一样本的输出必然一致，只需回放输出字段受变更影响的映射。
+    写入同一输出字段的映射整体保留，以维持原有的覆盖顺序。
+    """
+    def key(mapping):
+        return json.dumps(mapping, sort_keys=True, default=str)
+
+    def output(mapping):
+        return TransformService.output_field(mapping['channel_field'] or '')
+
+    old_counts = Counter(key(mapping) for mapping in old_mappings)
+    new_counts = Counter(key(mapping) for mapping in new_mappings)
+    changed = (old_counts - new_counts) + (new_counts - old_counts)
+    affected = {output(mapping) for mapping in old_mappings + new_mappings if key(mapping) in changed}
+    unchanged = sum((old_counts & new_counts).values())
+
+    return (
+        [mapping for mapping in old_mappings if output(mapping) in affected],
+        [mapping for mapping in new_mappings if output(mapping) in affected],
+        unchanged
+    )
+
+
+def _worker_count() -> int:
+    # 未配置时按CPU核数，但不超过 REPLAY_MAX_DEFAULT_WORKERS，避免在多核机器上占满所有核
+    return settings.REPLAY_WORKERS or min(os.cpu_count() or 1, settings.REPLAY_MAX_DEFAULT_WORKERS)
+
+
+def _portable(mappings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """只保留转换需要的映射字段，减少传给工作进程的数据"""
+    return [{
+        'internal_field': mapping.get('internal_field'),
+        'channel_field': mapping.get('channel_field'),
+        # 已编译的规则对象还原为字典，原样保留无法解析的规则以便回放时报告错误
+        'transform_rule': _portable_rule(mapping.get('transform_rule')),
+        'is_required': mapping.get('is_required', False),
+    } for mapping in mappings]
+
+
+def _portable_rule(rule: Any) -> Any:
+    try:
+        return parse_transform_rule(rule)
+    except Exception:
+        return rule
+
+
+replay_jobs = ReplayJobManager()
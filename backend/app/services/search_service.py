@@ -0,0 +1,230 @@
+import re
+from typing import Any, Dict, List
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from ..models.channel import Channel
+from .mapping_recommender import normalize_field_name
+
+# 下划线同样视为分隔符，使 trade_no 可以匹配 tradeNo
+_TERM_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+# SQLite：FTS5虚拟表，渠道与解析字段各占一行。
+# FTS5 的 UNINDEXED 列不能走索引，按渠道删除时通过普通表记录的行号定位
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS channel_search USING fts5(
+        channel_id UNINDEXED,
+        kind UNINDEXED,
+        field_name UNINDEXED,
+        field_terms,
+        name,
+        code,
+        description
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS channel_search_rowids (
+        rowid INTEGER PRIMARY KEY,
+        channel_id INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_channel_search_rowids_channel_id ON channel_search_rowids (channel_id)",
+]
+
+# Postgres：普通表 + tsvector列 + GIN索引
+POSTGRES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS channel_search (
+        channel_id INTEGER NOT NULL,
+        kind VARCHAR(10) NOT NULL,
+        field_name TEXT,
+        field_terms TEXT,
+        name TEXT,
+        code TEXT,
+        description TEXT,
+        document TSVECTOR
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_channel_search_document ON channel_search USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_channel_search_channel_id ON channel_search (channel_id)",
+]
+
+SQLITE_INSERT = """
+    INSERT INTO channel_search (rowid, channel_id, kind, field_name, field_terms, name, code, description)
+    VALUES (:rowid, :channel_id, :kind, :field_name, :field_terms, :name, :code, :description)
+"""
+
+SQLITE_DELETE = [
+    """
+    DELETE FROM channel_search WHERE rowid IN (
+        SELECT rowid FROM channel_search_rowids WHERE channel_id IN :channel_ids
+    )
+    """,
+    "DELETE FROM channel_search_rowids WHERE channel_id IN :channel_ids",
+]
+
+POSTGRES_DELETE = ["DELETE FROM channel_search WHERE channel_id IN :channel_ids"]
+
+POSTGRES_INSERT = """
+    INSERT INTO channel_search (channel_id, kind, field_name, field_terms, name, code, description, document)
+    VALUES (
+        :channel_id, :kind, :field_name, :field_terms, :name, :code, :description,
+        setweight(to_tsvector('simple', coalesce(:name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(:code, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(:field_terms, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(:description, '')), 'C')
+    )
+"""
+
+# bm25 列权重依次对应 channel_id, kind, field_name, field_terms, name, code, description
+SQLITE_SEARCH = """
+    SELECT channel_id, kind, field_name, description,
+           bm25(channel_search, 0, 0, 0, 8.0, 10.0, 10.0, 1.0) AS score
+    FROM channel_search
+    WHERE channel_search MATCH :query
+    ORDER BY score
+    LIMIT :limit OFFSET :offset
+"""
+
+SQLITE_COUNT = "SELECT count(*) FROM channel_search WHERE channel_search MATCH :query"
+
+POSTGRES_SEARCH = """
+    SELECT channel_id, kind, field_name, description,
+           ts_rank(document, to_tsquery('simple', :query)) AS score
+    FROM channel_search
+    WHERE document @@ to_tsquery('simple', :query)
+    ORDER BY score DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+POSTGRES_COUNT = "SELECT count(*) FROM channel_search WHERE document @@ to_tsquery('simple', :query)"
+
+
+class SearchService:
+    """渠道与解析字段的全文检索"""
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    @staticmethod
+    def ensure_index(connection) -> bool:
+        """创建索引表，返回是否为新建"""
+        dialect = connection.dialect.name
+        if dialect == 'sqlite':
+            # 行号表缺失（旧版本创建的索引）时同样需要重建
+            exists = connection.execute(text(
+                "SELECT count(*) FROM sqlite_master WHERE name IN ('channel_search', 'channel_search_rowids')"
+            )).scalar() == 2
+            ddl = SQLITE_DDL
+        else:
+            exists = connection.execute(text(
+                "SELECT to_regclass('channel_search') IS NOT NULL"
+            )).scalar()
+            ddl = POSTGRES_DDL
+        for statement in ddl:
+            connection.execute(text(statement))
+        return not exists
+
+    def index_channel(self, channel: Channel):
+        """重建单个渠道的索引行，与渠道写入在同一事务中提交"""
+        self.index_channels([channel])
+
+    def index_channels(self, channels: List[Any]):
+        """批量重建渠道索引行"""
+        if not channels:
+            return
+        channel_ids = [channel.id for channel in channels]
+        for statement in (SQLITE_DELETE if self.dialect == 'sqlite' else POSTGRES_DELETE):
+            self.db.execute(
+                text(statement).bindparams(bindparam("channel_ids", expanding=True)),
+                {"channel_ids": channel_ids}
+            )
+        self._insert_rows(channel_ids, [row for channel in channels for row in self._channel_rows(channel)])
+
+    def rebuild(self):
+        """全量重建索引"""
+        self.db.execute(text("DELETE FROM channel_search"))
+        if self.dialect == 'sqlite':
+            self.db.execute(text("DELETE FROM channel_search_rowids"))
+        for channel in self.db.query(Channel).yield_per(200):
+            self._insert_rows([channel.id], self._channel_rows(channel))
+        self.db.commit()
+
+    def _insert_rows(self, channel_ids: List[int], rows: List[Dict[str, Any]]):
+        """写入渠道的索引行；调用前这些渠道的旧索引行已删除"""
+        if not rows:
+            return
+        if self.dialect != 'sqlite':
+            self.db.execute(text(POSTGRES_INSERT), rows)
+            return
+        # 先在行号表中分配行号，再以相同行号写入全文索引
+        self.db.execute(text("INSERT INTO channel_search_rowids (channel_id) VALUES (:channel_id)"), rows)
+        rowids = self.db.execute(
+            text(
+                "SELECT rowid FROM channel_search_rowids WHERE channel_id IN :channel_ids ORDER BY rowid"
+            ).bindparams(bindparam("channel_ids", expanding=True)),
+            {"channel_ids": channel_ids}
+        ).scalars()
+        self.db.execute(text(SQLITE_INSERT), [dict(row, rowid=rowid) for row, rowid in zip(rows, rowids)])
+
+    def search(self, query: str, page: int = 1, page_size: int = 20) -> Dict[str, Any]:
+        """按相关度分页检索"""
+        terms = _TERM_RE.findall(query or '')
+        result = {"total": 0, "page": page, "page_size": page_size, "items": []}
+        if not terms:
+            return result
+
+        if self.dialect == 'sqlite':
+            # 每个词作为带前缀匹配的短语，词之间为AND
+            match = ' '.join('"{}"*'.format(term) for term in terms)
+            search_sql, count_sql = SQLITE_SEARCH, SQLITE_COUNT
+        else:
+            match = ' & '.join(f'{term}:*' for term in terms)
+            search_sql, count_sql = POSTGRES_SEARCH, POSTGRES_COUNT
+
+        params = {"query": match, "limit": page_size, "offset": (page - 1) * page_size}
+        result["total"] = self.db.execute(text(count_sql), params).scalar()
+        rows = self.db.execute(text(search_sql), params).fetchall()
+
+        channel_ids = {int(row.channel_id) for row in rows}
+        channels = {
+            channel.id: channel for channel in
+            self.db.query(Channel.id, Channel.name, Channel.code).filter(Channel.id.in_(channel_ids))
+        } if channel_ids else {}
+
+        for row in rows:
+            channel = channels.get(int(row.channel_id))
+            result["items"].append({
+                "channel_id": int(row.channel_id),
+                "channel_name": channel.name if channel else None,
+                "channel_code": channel.code if channel else None,
+                "kind": row.kind,
+                "field_name": row.field_name,
+                "description": row.description,
+                # bm25 分值越小越相关，统一为越大越相关
+                "score": round(-row.score if self.dialect == 'sqlite' else row.score, 4),
+            })
+        return result
+
+    @staticmethod
+    def _channel_rows(channel: Any) -> List[Dict[str, Any]]:
+        rows = [{
+            "channel_id": channel.id,
+            "kind": "channel",
+            "field_name": None,
+            "field_terms": None,
+            "name": channel.name,
+            "code": channel.code,
+            "description": channel.description,
+        }]
+        for field in (channel.config or {}).get('parsed_fields', []):
+            rows.append({
+                "channel_id": channel.id,
+                "kind": "field",
+                "field_name": field.get('name'),
+                "field_terms": normalize_field_name(field.get('name')).replace('_', ' '),
+                "name": None,
+                "code": None,
+                "description": field.get('description'),
+            })
+        return rows
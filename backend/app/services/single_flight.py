@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, Callable, Dict, Hashable, Tuple
+from starlette.concurrency import run_in_threadpool
+
+
+class SingleFlight:
+    """
+    合并并发的相同读请求：同一键在途时，后到的请求等待并共享首个请求的计算结果。
+    键的第一个元素为路由名，用于按路由统计合并次数。
+    """
+    def __init__(self):
+        self._calls: Dict[Tuple[Hashable, ...], asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    async def do(self, key: Tuple[Hashable, ...], fn: Callable[..., Any], *args) -> Any:
+        """在线程池中执行 fn，相同键的并发调用只执行一次"""
+        stats = self._stats.setdefault(key[0], {"executed": 0, "coalesced": 0})
+        future = self._calls.get(key)
+        if future is not None:
+            stats["coalesced"] += 1
+        else:
+            stats["executed"] += 1
+            future = asyncio.ensure_future(run_in_threadpool(fn, *args))
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        # 单个请求被取消时不影响共享同一计算的其他请求
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._calls),
+            "routes": {route: dict(stats) for route, stats in self._stats.items()},
+        }
+
+    def _forget(self, key: Tuple[Hashable, ...], future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            # 所有等待者都已取消时避免 "exception was never retrieved" 警告
+            future.exception()
+
+
+single_flight = SingleFlight()
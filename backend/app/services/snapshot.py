@@ -0,0 +1,276 @@
+"""
+渠道映射快照文件格式（小端序），可直接 mmap，按渠道懒解码：
+
+    头部      magic(8s) 格式版本(H) 保留(H) 渠道数(I) 快照版本(Q) 字符串数(I) 校验和(I)
+              索引偏移(Q) 映射记录偏移(Q) 字符串表偏移(Q)
+    索引      每个渠道一条：渠道ID(I) 编码(I) 首条映射序号(I) 映射数(I)，按渠道ID排序
+    映射记录  每条映射：内部字段(I) 渠道字段(I) 转换规则(I) 字段类型(I) 是否必填(B)
+    字符串表  (字符串数+1)个偏移(I)，之后为 UTF-8 字节
+
+字符串在文件内只保存一份，记录中以序号引用，NONE 表示空值；校验和为头部之后全部内容的 CRC32。
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from ..models.channel import Channel, FieldMapping
+from .transform_service import TransformService, parse_transform_rule
+
+
+MAGIC = b'CHANSNAP'
+FORMAT_VERSION = 1
+NONE = 0xFFFFFFFF
+HEADER = struct.Struct('<8sHHIQIIQQQ')
+INDEX_ENTRY = struct.Struct('<IIII')
+MAPPING_RECORD = struct.Struct('<IIIIB')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def write_snapshot(db: Session, path: str) -> Dict[str, Any]:
+    """导出所有启用渠道及其映射到快照文件；先写临时文件再替换，读取方不会看到半个文件"""
+    strings: Dict[str, int] = {}
+
+    def string_id(value: Optional[str]) -> int:
+        if value is None:
+            return NONE
+        sid = strings.get(value)
+        if sid is None:
+            sid = strings[value] = len(strings)
+        return sid
+
+    channels = db.query(Channel.id, Channel.code).filter(Channel.status == 'active').order_by(Channel.id).all()
+    channel_ids = [channel.id for channel in channels]
+    grouped: Dict[int, List[Any]] = {channel_id: [] for channel_id in channel_ids}
+    if channel_ids:
+        for mapping in db.query(FieldMapping).filter(
+            FieldMapping.channel_id.in_(channel_ids)
+        ).order_by(FieldMapping.channel_id, FieldMapping.id).yield_per(1000):
+            grouped[mapping.channel_id].append(mapping)
+
+    index = bytearray()
+    records = bytearray()
+    position = 0
+    for channel in channels:
+        mappings = grouped[channel.id]
+        index += INDEX_ENTRY.pack(channel.id, string_id(channel.code), position, len(mappings))
+        for mapping in mappings:
+            try:
+                rule = parse_transform_rule(mapping.transform_rule)
+                rule = json.dumps(rule, ensure_ascii=False, sort_keys=True) if rule else None
+            except ValueError as e:
+                # 无法解析的规则按原文写入，工作进程转换时报告与数据库路径相同的字段错误
+                print(f"Invalid transform rule for mapping {mapping.id} of channel {channel.id}: {str(e)}")
+                rule = mapping.transform_rule
+            records += MAPPING_RECORD.pack(
+                string_id(mapping.internal_field),
+                string_id(mapping.channel_field),
+                string_id(rule),
+                string_id(mapping.field_type),
+                1 if mapping.is_required else 0
+            )
+        position += len(mappings)
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = array('I', [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    if offsets.itemsize != 4:
+        raise SnapshotError("Unsupported platform: array('I') is not 32-bit")
+    string_table = offsets.tobytes() + b''.join(encoded)
+
+    index_offset = HEADER.size
+    records_offset = index_offset + len(index)
+    strings_offset = records_offset + len(records)
+    body = bytes(index) + bytes(records) + string_table
+    version = time.time_ns() // 1000000
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(channels), version, len(encoded), zlib.crc32(body),
+                         index_offset, records_offset, strings_offset)
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return {
+        "path": path,
+        "version": version,
+        "channels": len(channels),
+        "mappings": position,
+        "bytes": HEADER.size + len(body),
+    }
+
+
+class Snapshot:
+    """只读快照：打开时只校验头部并建立渠道索引，映射在首次访问时解码"""
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self._buffer
+        if len(buffer) < HEADER.size:
+            raise SnapshotError("Snapshot file is truncated")
+        (magic, format_version, _, channel_count, self.version, self._string_count, checksum,
+         index_offset, self._records_offset, self._strings_offset) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise SnapshotError("Not a channel snapshot file")
+        if format_version != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format version: {format_version}")
+        if zlib.crc32(memoryview(buffer)[HEADER.size:]) != checksum:
+            raise SnapshotError("Snapshot checksum mismatch")
+
+        self._text_offset = self._strings_offset + (self._string_count + 1) * 4
+        self._strings: Dict[int, str] = {}
+        self._mappings: Dict[int, List[Dict[str, Any]]] = {}
+        self._index: Dict[int, Any] = {}
+        for channel_id, code, first, count in INDEX_ENTRY.iter_unpack(
+            buffer[index_offset:index_offset + channel_count * INDEX_ENTRY.size]
+        ):
+            self._index[channel_id] = (code, first, count)
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def channels(self) -> List[Dict[str, Any]]:
+        return [{"id": channel_id, "code": self._string(code), "mappings": count}
+                for channel_id, (code, _, count) in self._index.items()]
+
+    def mappings(self, channel_id: int) -> Optional[List[Dict[str, Any]]]:
+        """渠道映射，格式与 channel_state_cache 中的一致；渠道不在快照中时返回 None"""
+        mappings = self._mappings.get(channel_id)
+        if mappings is not None:
+            return mappings
+        entry = self._index.get(channel_id)
+        if entry is None:
+            return None
+
+        _, first, count = entry
+        mappings = []
+        offset = self._records_offset + first * MAPPING_RECORD.size
+        for internal_field, channel_field, rule, field_type, is_required in MAPPING_RECORD.iter_unpack(
+            self._buffer[offset:offset + count * MAPPING_RECORD.size]
+        ):
+            rule = self._string(rule)
+            mappings.append({
+                'channel_id': channel_id,
+                'internal_field': self._string(internal_field),
+                'channel_field': self._string(channel_field),
+                'field_type': self._string(field_type),
+                'is_required': bool(is_required),
+                'transform_rule': _load_rule(rule),
+            })
+        # 与 channel_state_cache 一样按快照版本只编译一次；并发首次访问时可能重复解码，结果相同，无需加锁
+        mappings = self._mappings[channel_id] = TransformService.compile_mappings(mappings)
+        return mappings
+
+    def _string(self, sid: int) -> Optional[str]:
+        if sid == NONE:
+            return None
+        value = self._strings.get(sid)
+        if value is None:
+            start, end = struct.unpack_from('<II', self._buffer, self._strings_offset + sid * 4)
+            value = self._strings[sid] = self._buffer[self._text_offset + start:self._text_offset + end].decode('utf-8')
+        return value
+
+
+class SnapshotStore:
+    """转换工作进程持有的当前快照，后台线程轮询文件变化并热加载"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._signature = None
+        self.path: Optional[str] = None
+        self.snapshot: Optional[Snapshot] = None
+        self.state: Dict[str, Any] = {
+            "version": None,
+            "channels": 0,
+            "loaded_at": None,
+            "load_ms": None,
+            "reloads": 0,
+            "error": None,
+        }
+
+    def load(self, path: str) -> bool:
+        """加载快照；失败时保留当前快照并记录错误"""
+        self.path = path
+        with self._lock:
+            started = time.perf_counter()
+            signature = None
+            try:
+                signature = _file_signature(path)
+                snapshot = Snapshot(path)
+            except (OSError, ValueError, SnapshotError) as e:
+                # 记录失败文件的签名，文件再次变化前不重复加载
+                self._signature = signature or self._signature
+                self.state["error"] = str(e)
+                print(f"Failed to load snapshot {path}: {str(e)}")
+                return False
+            # 替换引用即可，旧快照在不再被引用后自动释放
+            reloaded = self.snapshot is not None
+            self.snapshot = snapshot
+            self._signature = signature
+            self.state.update({
+                "version": snapshot.version,
+                "channels": len(snapshot),
+                "loaded_at": time.time(),
+                "load_ms": round((time.perf_counter() - started) * 1000, 3),
+                "error": None,
+            })
+            self.state["reloads"] += reloaded
+        print(f"Loaded snapshot version {snapshot.version} with {len(snapshot)} channels "
+              f"in {self.state['load_ms']}ms")
+        return True
+
+    def start_watching(self, interval: float):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, args=(interval,), name="snapshot-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                signature = _file_signature(self.path)
+            except OSError:
+                continue
+            if signature != self._signature:
+                self.load(self.path)
+
+
+def _load_rule(rule: Optional[str]) -> Any:
+    if rule is None:
+        return None
+    try:
+        return json.loads(rule)
+    except ValueError:
+        # 导出时无法解析的规则保留原文，由 compile_mappings 按无效规则处理
+        return rule
+
+
+def _file_signature(path: str):
+    # 导出时通过 os.replace 原子替换，inode 或修改时间变化即视为新快照
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+snapshot_store = SnapshotStore()
@@ -1,9 +1,34 @@
 from datetime import datetime
 import json
-import re
-from typing import Any, Dict, Optional, List
-from jsonpath_ng import parse as parse_jsonpath
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, List, Tuple
 from pydantic import BaseModel, Field
+from .regex_engine import RegexGroup, combinable, compile_regex
+
+
+@lru_cache(maxsize=1024)
+def compile_jsonpath(path: str):
+    """编译并缓存JSONPath表达式，jsonpath_ng（含PLY语法构建）在首次使用时才导入"""
+    from jsonpath_ng import parse as parse_jsonpath
+    return parse_jsonpath(path)
+
+def parse_transform_rule(raw: Any) -> Optional[Dict[str, Any]]:
+    """解析数据库中保存的转换规则（JSON字符串，兼容旧的单引号格式）"""
+    if not raw or raw == 'None':
+        return None
+    if isinstance(raw, dict):
+        return raw
+    if isinstance(raw, TransformRule):
+        # 已编译的映射
+        return raw.dict()
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return json.loads(raw.replace("'", '"'))
+
+class CompiledMappings(list):
+    """compile_mappings 的结果；传给 batch_transform 等方法时不再重复编译"""
 
 class TransformRule(BaseModel):
     type: str
@@ -61,7 +86,7 @@ class TransformService:
                             error="未指定JSONPath表达式"
                         )
 
-                    jsonpath_expr = parse_jsonpath(path)
+                    jsonpath_expr = compile_jsonpath(path)
                     matches = jsonpath_expr.find(value)
                     
                     if not matches:
@@ -91,7 +116,7 @@ class TransformService:
                         )
                     
                     group = rule.params.get("group", 0)
-                    matches = re.search(pattern, str(value))
+                    matches = compile_regex(pattern).search(str(value))
                     
                     if not matches:
                         return TransformResult(
@@ -203,63 +228,263 @@ class TransformService:
         result = {}
         errors = []
 
-        for mapping in mappings:
-            try:
-                # 获取字段映射信息
-                internal_field = mapping.get('internal_field')
-                channel_field = mapping.get('channel_field')
-                transform_rule = mapping.get('transform_rule')
+        for mapping in TransformService.compile_mappings(mappings):
+            TransformService._apply_mapping(data, mapping, result, errors)
+
+        if errors:
+            raise ValueError({"errors": errors})
+
+        return result
+
+    @staticmethod
+    def reverse_transform(data: Any, mappings: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[str]]:
+        """按响应映射把渠道响应转换回内部字段：JSONPath 提取渠道字段，再应用转换规则"""
+        result = {}
+        errors = []
+
+        for mapping in TransformService.compile_mappings(mappings):
+            internal_field = mapping.get('internal_field')
+            channel_field = mapping.get('channel_field')
+            if not internal_field or not channel_field:
+                continue
+
+            if channel_field.startswith('$'):
+                transform_result = TransformService.transform(
+                    data, TransformRule(type="jsonpath", params={"path": channel_field})
+                )
+                value = transform_result.value if transform_result.success else None
+            else:
+                value = data.get(channel_field) if isinstance(data, dict) else None
 
-                if not internal_field or not channel_field:
+            if value is None:
+                if mapping.get('is_required', False):
+                    errors.append(f"Missing required field: {channel_field}")
+                continue
+
+            rule = mapping.get('transform_rule')
+            if isinstance(rule, TransformRule) and rule.type != 'jsonpath':
+                transform_result = TransformService.transform(value, rule)
+                if not transform_result.success:
+                    errors.append(f"Transform failed for {internal_field}: {transform_result.error}")
                     continue
+                value = transform_result.value
+            elif rule and not isinstance(rule, TransformRule):
+                errors.append(f"Transform error for {internal_field}: invalid transform rule")
+                continue
+
+            result[internal_field] = value
 
-                # 获取输入值
-                value = data.get(internal_field)
-                if value is None and '$.alipay_trade_query_response' in channel_field:
-                    # 如果是查询响应映射，直接使用整个输入数据
-                    value = data
+        return result, errors
 
-                if value is None:
-                    if mapping.get('is_required', False):
-                        errors.append(f"Missing required field: {internal_field}")
+    @staticmethod
+    def trace_transform(data: Dict[str, Any], mappings: List[Dict[str, Any]], top: int = 5) -> Dict[str, Any]:
+        """批量转换并记录每个字段的转换步骤、中间值及耗时（纳秒）"""
+        result = {}
+        errors = []
+        fields = []
+
+        for mapping in mappings:
+            steps = []
+            error_count = len(errors)
+            started = time.perf_counter_ns()
+            TransformService._apply_mapping(data, mapping, result, errors, steps)
+            fields.append({
+                'internal_field': mapping.get('internal_field'),
+                'channel_field': mapping.get('channel_field'),
+                'success': len(errors) == error_count,
+                'errors': errors[error_count:],
+                'elapsed_ns': time.perf_counter_ns() - started,
+                'steps': steps,
+            })
+
+        rules: Dict[str, Dict[str, Any]] = {}
+        for field in fields:
+            for step in field['steps']:
+                if step['step'] not in ('jsonpath', 'rule'):
                     continue
+                stats = rules.setdefault(step['rule_type'], {'rule_type': step['rule_type'], 'count': 0, 'total_ns': 0, 'max_ns': 0})
+                stats['count'] += 1
+                stats['total_ns'] += step['elapsed_ns']
+                stats['max_ns'] = max(stats['max_ns'], step['elapsed_ns'])
 
-                # 应用转换规则
-                if transform_rule and transform_rule != 'None':
-                    try:
-                        rule_dict = json.loads(transform_rule.replace("'", '"')) if isinstance(transform_rule, str) else transform_rule
-                        
-                        # 如果是查询响应映射，先应用jsonpath转换
-                        if '$.alipay_trade_query_response' in channel_field:
-                            jsonpath_rule = TransformRule(
-                                type="jsonpath",
-                                params={"path": channel_field}
-                            )
-                            transform_result = TransformService.transform(value, jsonpath_rule)
-                            if not transform_result.success:
-                                errors.append(f"JSONPath transform failed for {internal_field}: {transform_result.error}")
-                                continue
-                            value = transform_result.value
-
-                        # 应用其他转换规则（如enum_map）
-                        if rule_dict['type'] != 'jsonpath':
-                            transform_result = TransformService.transform(value, TransformRule(**rule_dict))
-                            if not transform_result.success:
-                                errors.append(f"Transform failed for {internal_field}: {transform_result.error}")
-                                continue
-                            value = transform_result.value
-                    except Exception as e:
-                        errors.append(f"Transform error for {internal_field}: {str(e)}")
-                        continue
-
-                # 获取实际的渠道字段名（去掉jsonpath前缀）
-                actual_channel_field = channel_field.split('.')[-1] if '$.alipay_trade_query_response' in channel_field else channel_field
-                result[actual_channel_field] = value
-
-            except Exception as e:
-                errors.append(f"Error processing mapping: {str(e)}")
+        return {
+            'success': not errors,
+            'result': result,
+            'errors': errors,
+            'fields': fields,
+            'summary': {
+                'total_ns': sum(field['elapsed_ns'] for field in fields),
+                'slowest_fields': [
+                    {key: field[key] for key in ('internal_field', 'channel_field', 'elapsed_ns')}
+                    for field in sorted(fields, key=lambda f: f['elapsed_ns'], reverse=True)[:top]
+                ],
+                'slowest_rules': sorted(rules.values(), key=lambda r: r['total_ns'], reverse=True)[:top],
+            }
+        }
 
-        if errors:
-            raise ValueError({"errors": errors})
+    @staticmethod
+    def _apply_mapping(data: Dict[str, Any], mapping: Dict[str, Any], result: Dict[str, Any],
+                       errors: List[str], steps: Optional[List[Dict[str, Any]]] = None):
+        """转换单个字段映射；steps 不为 None 时记录每一步（仅追踪模式）"""
+        try:
+            # 获取字段映射信息
+            internal_field = mapping.get('internal_field')
+            channel_field = mapping.get('channel_field')
+            transform_rule = mapping.get('transform_rule')
 
-        return result
+            if not internal_field or not channel_field:
+                return
+
+            # 获取输入值
+            value = data.get(internal_field)
+            if value is None and '$.alipay_trade_query_response' in channel_field:
+                # 如果是查询响应映射，直接使用整个输入数据
+                value = data
+
+            if steps is not None:
+                steps.append({'step': 'input', 'source_field': internal_field, 'value': value})
+
+            if value is None:
+                if mapping.get('is_required', False):
+                    errors.append(f"Missing required field: {internal_field}")
+                return
+
+            # 应用转换规则
+            if transform_rule and transform_rule != 'None':
+                try:
+                    rule = TransformService._load_rule(transform_rule)
+                    rule_type = rule.type if isinstance(rule, TransformRule) else rule['type']
+                    
+                    # 如果是查询响应映射，先应用jsonpath转换
+                    if '$.alipay_trade_query_response' in channel_field:
+                        jsonpath_rule = TransformRule(
+                            type="jsonpath",
+                            params={"path": channel_field}
+                        )
+                        transform_result = TransformService._run_step(value, jsonpath_rule, 'jsonpath', steps)
+                        if not transform_result.success:
+                            errors.append(f"JSONPath transform failed for {internal_field}: {transform_result.error}")
+                            return
+                        value = transform_result.value
+
+                    # 应用其他转换规则（如enum_map）
+                    if rule_type != 'jsonpath':
+                        if not isinstance(rule, TransformRule):
+                            rule = TransformRule(**rule)
+                        regex_group = mapping.get('regex_group')
+                        if regex_group is not None and steps is None:
+                            transform_result = TransformService._extract_grouped(value, rule, *regex_group)
+                        else:
+                            transform_result = TransformService._run_step(value, rule, 'rule', steps)
+                        if not transform_result.success:
+                            errors.append(f"Transform failed for {internal_field}: {transform_result.error}")
+                            return
+                        value = transform_result.value
+                except Exception as e:
+                    errors.append(f"Transform error for {internal_field}: {str(e)}")
+                    return
+
+            # 获取实际的渠道字段名（去掉jsonpath前缀）
+            actual_channel_field = TransformService.output_field(channel_field)
+            result[actual_channel_field] = value
+            if steps is not None:
+                steps.append({'step': 'output', 'output_field': actual_channel_field, 'value': value})
+
+        except Exception as e:
+            errors.append(f"Error processing mapping: {str(e)}")
+
+    @staticmethod
+    def output_field(channel_field: str) -> str:
+        """映射输出的渠道字段名"""
+        return channel_field.split('.')[-1] if '$.alipay_trade_query_response' in channel_field else channel_field
+
+    @staticmethod
+    def compile_mappings(mappings: List[Dict[str, Any]]) -> CompiledMappings:
+        """
+        预先构建映射中的转换规则对象并编译其中的JSONPath，供重复转换大量数据时使用；
+        channel_state_cache 按映射版本缓存编译结果，已编译的映射直接返回。
+        同一输入字段上的多条正则规则合并为一个正则，一次匹配填充多个输出字段。
+        """
+        if isinstance(mappings, CompiledMappings):
+            return mappings
+
+        compiled = CompiledMappings()
+        regex_inputs: Dict[str, List[Dict[str, Any]]] = {}
+        for mapping in mappings:
+            mapping = dict(mapping)
+            channel_field = mapping.get('channel_field') or ''
+            if channel_field.startswith('$'):
+                try:
+                    compile_jsonpath(channel_field)
+                except Exception:
+                    # 表达式无效时转换阶段会报告错误
+                    pass
+            transform_rule = mapping.get('transform_rule')
+            if transform_rule and transform_rule != 'None':
+                try:
+                    rule = TransformService._load_rule(transform_rule)
+                    rule = rule if isinstance(rule, TransformRule) else TransformRule(**rule)
+                    mapping['transform_rule'] = rule
+                    if rule.type == 'jsonpath' and isinstance(rule.params.get('path'), str):
+                        compile_jsonpath(rule.params['path'])
+                    if rule.type == 'regex' and combinable(rule.params.get('pattern')) \
+                            and '$.alipay_trade_query_response' not in (mapping.get('channel_field') or ''):
+                        regex_inputs.setdefault(mapping.get('internal_field'), []).append(mapping)
+                except Exception:
+                    # 保留原始配置，转换时按原逻辑报告错误
+                    pass
+            compiled.append(mapping)
+
+        for group_mappings in regex_inputs.values():
+            if len(group_mappings) < 2:
+                continue
+            group = RegexGroup([mapping['transform_rule'].params['pattern'] for mapping in group_mappings])
+            for index, mapping in enumerate(group_mappings):
+                mapping['regex_group'] = (group, index)
+        return compiled
+
+    @staticmethod
+    def _extract_grouped(value: Any, rule: TransformRule, group: RegexGroup, index: int) -> TransformResult:
+        """从合并正则的匹配结果中取出单条规则的值"""
+        try:
+            matched, group_value = group.extract(index, value, rule.params.get("group", 0))
+        except Exception as e:
+            return TransformResult(
+                success=False,
+                error=f"正则表达式提取失败: {str(e)}"
+            )
+        if not matched:
+            return TransformResult(
+                success=False,
+                error="未找到匹配的值"
+            )
+        return TransformResult(
+            success=True,
+            value=group_value
+        )
+
+    @staticmethod
+    def _load_rule(transform_rule: Any) -> Any:
+        if isinstance(transform_rule, str):
+            return parse_transform_rule(transform_rule)
+        return transform_rule
+
+    @staticmethod
+    def _run_step(value: Any, rule: TransformRule, step: str,
+                  steps: Optional[List[Dict[str, Any]]]) -> TransformResult:
+        if steps is None:
+            return TransformService.transform(value, rule)
+
+        started = time.perf_counter_ns()
+        transform_result = TransformService.transform(value, rule)
+        steps.append({
+            'step': step,
+            'rule_type': rule.type,
+            'params': rule.params,
+            'input': value,
+            'output': transform_result.value,
+            'success': transform_result.success,
+            'error': transform_result.error,
+            'elapsed_ns': time.perf_counter_ns() - started,
+        })
+        return transform_result
@@ -1,7 +1,9 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 import re
 from .transform_service import TransformService
+from .field_catalog import FieldCatalog
+from .regex_engine import check_pattern
 
 class FieldValidator:
     """字段验证器"""
@@ -109,19 +111,25 @@ class ValidationService:
                 # 只验证规则配置的结构，不验证测试值
                 if not isinstance(rule_config, dict) or 'type' not in rule_config or 'params' not in rule_config:
                     errors.append("Invalid transform rule configuration structure")
+                elif rule_config['type'] == 'regex':
+                    # 保存时拒绝可能导致灾难性回溯的正则
+                    for problem in check_pattern((rule_config['params'] or {}).get('pattern')):
+                        errors.append(f"Regex rule rejected: {problem}")
             except Exception as e:
                 errors.append(f"Transform rule error: {str(e)}")
 
         return errors
 
-    def validate_mappings(self, mappings: List[Any], channel_fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def validate_mappings(self, mappings: List[Any], channel_fields: Union[List[Dict[str, Any]], FieldCatalog]) -> Dict[str, Any]:
         """验证所有字段映射"""
         validation_results = {
             'valid': True,
             'errors': []
         }
 
-        channel_fields_dict = {field['name']: field for field in channel_fields}
+        # 字段目录自带按名称的索引，无需再构建字典
+        channel_fields_dict = channel_fields if isinstance(channel_fields, FieldCatalog) \
+            else {field['name']: field for field in channel_fields}
 
         for mapping in mappings:
             # 将 Pydantic 模型转换为字典
@@ -0,0 +1,55 @@
+"""
+转换工作进程：只提供转换接口，映射从快照文件读取，不连接数据库。
+
+    python -m scripts.export_snapshot --output channel_snapshot.bin
+    SNAPSHOT_PATH=channel_snapshot.bin uvicorn app.worker:app --workers 4
+"""
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from typing import Any, Dict, List
+from .routers import transform
+from .core.config import settings
+from .services.snapshot import snapshot_store
+
+app = FastAPI(
+    title="支付渠道转换服务",
+    description="基于映射快照的转换接口",
+    version="1.0.0"
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(transform.router, prefix=settings.API_V1_STR)
+
+def snapshot_mappings(channel_id: int) -> List[Dict[str, Any]]:
+    snapshot = snapshot_store.snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="Snapshot not loaded")
+    mappings = snapshot.mappings(channel_id)
+    if mappings is None:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    return mappings
+
+app.dependency_overrides[transform.channel_mappings] = snapshot_mappings
+
+@app.on_event("startup")
+async def on_startup():
+    snapshot_store.load(settings.SNAPSHOT_PATH)
+    snapshot_store.start_watching(settings.SNAPSHOT_POLL_SECONDS)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    snapshot_store.stop()
+
+@app.get("/ready")
+async def ready():
+    """就绪检查，快照加载成功后才返回就绪"""
+    status_code = 200 if snapshot_store.snapshot is not None else 503
+    return JSONResponse(status_code=status_code, content=snapshot_store.state)
@@ -0,0 +1,35 @@
+"""
+导出映射快照，供转换工作进程（app.worker）加载
+
+在 backend 目录下运行：
+    python -m scripts.export_snapshot --output channel_snapshot.bin
+
+输出文件被原子替换，运行中的工作进程会自动热加载。
+"""
+import argparse
+import time
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.snapshot import write_snapshot
+
+
+def main(args: argparse.Namespace):
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        info = write_snapshot(db, args.output)
+    finally:
+        db.close()
+    print(f"Snapshot version {info['version']}: {info['channels']} channels, {info['mappings']} mappings, "
+          f"{info['bytes']} bytes written to {info['path']} in {round(time.perf_counter() - started, 3)}s")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="导出启用渠道及其映射的快照文件")
+    parser.add_argument("--output", default=settings.SNAPSHOT_PATH)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,232 @@
+"""
+接口压测工具
+
+在 backend 目录下运行：
+    python -m scripts.loadtest --concurrency 16 --duration 10 --output loadtest.json
+    python -m scripts.loadtest --base-url http://localhost:8000 --scenarios list_channels get_mappings
+
+未指定 --base-url 时通过 ASGI transport 在进程内驱动 app.main:app，会写入当前配置的数据库，
+压测数据使用 loadtest- 前缀的渠道编码。
+"""
+import argparse
+import asyncio
+import json
+import math
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+API = "/api"
+
+
+def build_fields(count: int) -> List[Dict[str, Any]]:
+    return [{
+        "name": f"field_{i}",
+        "type": "string",
+        "required": i % 10 == 0,
+        "description": f"压测字段 {i}",
+        "source": "components.schemas.LoadTest",
+    } for i in range(count)]
+
+
+def build_mappings(channel_id: int, count: int) -> List[Dict[str, Any]]:
+    mappings = []
+    for i in range(count):
+        rules = {"channel_field": f"field_{i}", "internal_field": f"internal_{i}"}
+        if i % 3 == 0:
+            rules["transform_rule"] = {"type": "multiply", "params": {"value": 100}}
+        elif i % 3 == 1:
+            rules["transform_rule"] = {"type": "enum_map", "params": {"mapping": {"A": "a", "B": "b"}}}
+        mappings.append({"channel_id": channel_id, "name": f"field_{i}", "mapping_rules": rules})
+    return mappings
+
+
+def build_payload(count: int) -> Dict[str, Any]:
+    return {f"internal_{i}": (i if i % 3 == 0 else "A" if i % 3 == 1 else f"value_{i}") for i in range(count)}
+
+
+def build_spec(schemas: int, properties: int) -> Dict[str, Any]:
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Load test", "version": "1.0.0"},
+        "paths": {},
+        "components": {"schemas": {
+            f"Schema{s}": {
+                "type": "object",
+                "required": [f"prop_{p}" for p in range(0, properties, 5)],
+                "properties": {
+                    f"prop_{p}": {"type": "string", "description": f"模型 {s} 的属性 {p}"}
+                    for p in range(properties)
+                },
+            } for s in range(schemas)
+        }},
+    }
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.channel_id = None
+        self.mappings = None
+        self.payload = None
+        self.spec = None
+
+    async def setup(self):
+        """创建压测渠道并保存映射"""
+        response = await self.client.post(f"{API}/channels/", json={
+            "name": "Load test channel",
+            "code": f"loadtest-{uuid.uuid4().hex[:12]}",
+            "api_base_url": "http://localhost",
+            "status": "active",
+            "config": {"parsed_fields": build_fields(self.args.fields)},
+        })
+        response.raise_for_status()
+        self.channel_id = response.json()["id"]
+        self.mappings = build_mappings(self.channel_id, self.args.fields)
+        self.payload = build_payload(self.args.fields)
+        self.spec = json.dumps(build_spec(self.args.spec_schemas, self.args.spec_properties))
+        response = await self.client.post(f"{API}/mappings/{self.channel_id}", json=self.mappings)
+        response.raise_for_status()
+
+    def scenarios(self) -> Dict[str, Callable[[], Awaitable[httpx.Response]]]:
+        return {
+            "list_channels": lambda: self.client.get(f"{API}/channels/"),
+            "get_mappings": lambda: self.client.get(f"{API}/mappings/{self.channel_id}"),
+            "save_mappings": lambda: self.client.post(f"{API}/mappings/{self.channel_id}", json=self.mappings),
+            "bulk_transform": lambda: self.client.post(
+                f"{API}/transform/{self.channel_id}", json={"input_data": self.payload}
+            ),
+            # 调试用的逐字段追踪，额外记录每一步的中间值与耗时
+            "trace": lambda: self.client.post(
+                f"{API}/mappings/{self.channel_id}/trace", json={"input_data": self.payload}
+            ),
+            "upload_spec": self.upload_spec,
+        }
+
+    async def upload_spec(self) -> httpx.Response:
+        """上传文档并等待后台解析完成，耗时为端到端时间"""
+        response = await self.client.post(
+            f"{API}/channels/{self.channel_id}/doc",
+            files={"doc_file": ("spec.json", self.spec, "application/json")},
+        )
+        if response.status_code >= 400:
+            return response
+        job_id = response.json()["job_id"]
+        while True:
+            response = await self.client.get(f"{API}/channels/{self.channel_id}/doc/jobs/{job_id}")
+            if response.status_code >= 400 or response.json()["status"] == "succeeded":
+                return response
+            if response.json()["status"] == "failed":
+                return httpx.Response(500, json=response.json(), request=response.request)
+            await asyncio.sleep(0.05)
+
+    async def run_scenario(self, call: Callable[[], Awaitable[httpx.Response]]) -> Dict[str, Any]:
+        latencies: List[float] = []
+        errors: Dict[str, int] = {}
+        deadline = time.perf_counter() + self.args.duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await call()
+                    if response.status_code >= 400:
+                        key = f"HTTP {response.status_code}"
+                        errors[key] = errors.get(key, 0) + 1
+                except Exception as e:
+                    key = type(e).__name__
+                    errors[key] = errors.get(key, 0) + 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        elapsed = time.perf_counter() - started
+        return summarize(latencies, errors, elapsed)
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """最近秩百分位数"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: Dict[str, int], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latencies)
+    total = len(latencies)
+    error_count = sum(errors.values())
+    return {
+        "requests": total,
+        "errors": error_count,
+        "error_rate": round(error_count / total, 4) if total else 0.0,
+        "error_types": errors,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+def make_client(args: argparse.Namespace) -> httpx.AsyncClient:
+    timeout = httpx.Timeout(args.timeout)
+    if args.base_url:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        return httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits)
+
+    from app.core.init_db import init_db
+    from app.main import app
+    init_db()
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=timeout)
+
+
+async def main(args: argparse.Namespace):
+    async with make_client(args) as client:
+        load_test = LoadTest(client, args)
+        await load_test.setup()
+        scenarios = load_test.scenarios()
+
+        report = {
+            "target": args.base_url or "in-process",
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "fields": args.fields,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "scenarios": {},
+        }
+        for name in args.scenarios:
+            print(f"Running scenario {name} ...")
+            report["scenarios"][name] = result = await load_test.run_scenario(scenarios[name])
+            print(f"  {result['throughput_rps']} req/s, p50 {result['latency_ms']['p50']}ms, "
+                  f"p99 {result['latency_ms']['p99']}ms, error rate {result['error_rate']}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Report written to {args.output}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="支付渠道管理系统压测工具")
+    parser.add_argument("--base-url", help="压测已启动的服务，例如 http://localhost:8000；默认进程内压测")
+    parser.add_argument("--scenarios", nargs="+",
+                        default=["list_channels", "get_mappings", "save_mappings", "bulk_transform", "trace", "upload_spec"],
+                        choices=["list_channels", "get_mappings", "save_mappings", "bulk_transform", "trace", "upload_spec"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="每个场景的持续时间（秒）")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--fields", type=int, default=300, help="映射字段数")
+    parser.add_argument("--spec-schemas", type=int, default=200)
+    parser.add_argument("--spec-properties", type=int, default=30)
+    parser.add_argument("--output", default="loadtest.json")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,17 @@
+import queue
+import threading
+
+from app.services.audit_log import AuditLogger
+
+
+def test_record_drops_and_counts_when_queue_is_full():
+    logger = AuditLogger()
+    logger._queue = queue.Queue(maxsize=1)
+    # 不启动后台线程，让队列保持满
+    logger._thread = threading.Thread(target=lambda: None)
+
+    logger.record("tester", "update", "channel", 1, after={"name": "a"})
+    logger.record("tester", "update", "channel", 1, after={"name": "b"})
+
+    assert logger._queue.qsize() == 1
+    assert logger.stats() == {"recorded": 2, "written": 0, "dropped": 1, "pending": 1}
@@ -0,0 +1,25 @@
+from app.core.config import settings
+from app.models.channel import Channel, FieldMapping
+from app.services.channel_state import ChannelStateCache
+
+
+def _add_mapping(db, channel_id, channel_field):
+    db.add(FieldMapping(channel_id=channel_id, internal_field=channel_field, channel_field=channel_field))
+    db.commit()
+
+
+def test_get_reloads_changes_from_other_processes_after_ttl(db, monkeypatch):
+    channel = Channel(name="A", code="a", api_base_url="http://a")
+    db.add(channel)
+    db.commit()
+    _add_mapping(db, channel.id, "amount")
+    cache = ChannelStateCache()
+
+    monkeypatch.setattr(settings, "CHANNEL_STATE_TTL_SECONDS", 60.0)
+    assert len(cache.get(db, channel.id)['mappings']) == 1
+    # 模拟其他 worker 写入映射：本进程的缓存没有被 invalidate
+    _add_mapping(db, channel.id, "currency")
+    assert len(cache.get(db, channel.id)['mappings']) == 1
+
+    monkeypatch.setattr(settings, "CHANNEL_STATE_TTL_SECONDS", 0.0)
+    assert len(cache.get(db, channel.id)['mappings']) == 2
@@ -0,0 +1,109 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.dispatch_service import ChannelDispatcher, DispatchError
+
+
+@pytest.fixture(autouse=True)
+def fast_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DISPATCH_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "DISPATCH_BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(settings, "DISPATCH_BREAKER_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "DISPATCH_BREAKER_RESET_SECONDS", 0.05)
+
+
+class Upstream:
+    """按顺序返回预设响应的渠道桩，记录收到的请求"""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def _dispatch(dispatcher, method="GET", channel=None):
+    channel = channel or SimpleNamespace(id=1, api_base_url="http://upstream")
+    return asyncio.run(dispatcher.dispatch(channel, [], method, "/pay", {}))
+
+
+def test_retries_idempotent_request_on_503():
+    upstream = Upstream(httpx.Response(503), httpx.Response(200, json={"ok": True}))
+    result = _dispatch(ChannelDispatcher(httpx.MockTransport(upstream)))
+    assert result["status_code"] == 200
+    assert result["attempts"] == 2
+    assert len(upstream.requests) == 2
+
+
+def test_does_not_retry_post_and_propagates_5xx():
+    upstream = Upstream(httpx.Response(503, json={"error": "busy"}))
+    with pytest.raises(DispatchError) as error:
+        _dispatch(ChannelDispatcher(httpx.MockTransport(upstream)), method="POST")
+    assert error.value.status_code == 502
+    assert error.value.detail["status_code"] == 503
+    assert error.value.detail["response"] == {"error": "busy"}
+    assert len(upstream.requests) == 1
+
+
+def test_breaker_opens_half_opens_and_closes():
+    upstream = Upstream(httpx.Response(500))
+    dispatcher = ChannelDispatcher(httpx.MockTransport(upstream))
+    for _ in range(2):
+        with pytest.raises(DispatchError):
+            _dispatch(dispatcher, method="POST")
+    assert dispatcher.breaker(1).state == "open"
+
+    with pytest.raises(DispatchError) as error:
+        _dispatch(dispatcher, method="POST")
+    assert error.value.status_code == 503
+    assert len(upstream.requests) == 2
+
+    time.sleep(0.06)
+    upstream.responses = [httpx.Response(200, json={})]
+    assert _dispatch(dispatcher, method="POST")["status_code"] == 200
+    assert dispatcher.breaker(1).snapshot() == {"state": "closed", "failures": 0}
+
+
+def test_unexpected_probe_error_does_not_wedge_half_open_breaker():
+    upstream = Upstream(httpx.Response(500))
+    dispatcher = ChannelDispatcher(httpx.MockTransport(upstream))
+    for _ in range(2):
+        with pytest.raises(DispatchError):
+            _dispatch(dispatcher, method="POST")
+
+    time.sleep(0.06)
+    upstream.responses = [RuntimeError("boom")]
+    with pytest.raises(RuntimeError):
+        _dispatch(dispatcher, method="POST")
+    assert dispatcher.breaker(1).state == "open"
+
+    time.sleep(0.06)
+    upstream.responses = [httpx.Response(200, json={})]
+    assert _dispatch(dispatcher, method="POST")["status_code"] == 200
+
+
+def test_reuses_pooled_client_per_channel():
+    dispatcher = ChannelDispatcher(httpx.MockTransport(Upstream(httpx.Response(200, json={}))))
+    channel = SimpleNamespace(id=1, api_base_url="http://upstream")
+
+    async def run():
+        await dispatcher.dispatch(channel, [], "GET", "/pay", {})
+        first = dispatcher._clients[1][1]
+        await dispatcher.dispatch(channel, [], "GET", "/pay", {})
+        assert dispatcher._clients[1][1] is first
+        channel.api_base_url = "http://other"
+        await dispatcher.dispatch(channel, [], "GET", "/pay", {})
+        assert dispatcher._clients[1][1] is not first
+        assert first.is_closed
+        await dispatcher.shutdown()
+
+    asyncio.run(run())
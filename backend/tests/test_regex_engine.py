@@ -0,0 +1,43 @@
+import re
+import time
+
+import pytest
+
+from app.services.regex_engine import check_pattern, combinable
+
+
+@pytest.mark.parametrize("pattern", [
+    r'\s*.*\s*.*\s*.*=',
+    r'(.*a){12}',
+    r'.*(\d+)x',
+    r'(a+)+$',
+    r'(a|a)*b',
+    r'(x)(?:\1)+',
+])
+def test_rejects_catastrophic_patterns(pattern):
+    assert check_pattern(pattern)
+
+
+@pytest.mark.parametrize("pattern", [
+    r'(\d+)-x',
+    r'.*?(\d+)',
+    r'([a-z]+)\s(\d+)',
+    r'(\d+-){3}x',
+    r'(.*)-(.*)',
+    r'^\s*(\w+)\s*$',
+    r'[^,]*,[^,]*,x',
+])
+def test_accepts_linear_patterns(pattern):
+    assert check_pattern(pattern) == []
+
+
+def test_accepted_patterns_stay_fast_on_adversarial_input():
+    started = time.perf_counter()
+    for pattern in (r'(\d+)-x', r'[^,]*,[^,]*,x', r'(.*)-(.*)'):
+        re.search(pattern, ' ' * 2000 + '1' * 2000)
+    assert time.perf_counter() - started < 1
+
+
+def test_conditional_group_reference_is_not_combinable():
+    assert not combinable(r'(a)?(?(1)b|c)')
+    assert check_pattern(r'(a)?(?(1)(b+)+|c)')
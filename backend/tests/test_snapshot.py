@@ -0,0 +1,44 @@
+import json
+
+from app.models.channel import Channel, FieldMapping
+from app.services.channel_state import ChannelStateCache
+from app.services.snapshot import Snapshot, write_snapshot
+from app.services.transform_service import TransformService
+
+
+def _errors(data, mappings):
+    try:
+        TransformService.batch_transform(data, mappings)
+    except ValueError as e:
+        return e.args[0]["errors"]
+    return []
+
+
+def test_bad_rule_does_not_abort_export(db, tmp_path):
+    good = Channel(name="good", code="good", status="active")
+    bad = Channel(name="bad", code="bad", status="active")
+    db.add_all([good, bad])
+    db.flush()
+    db.add_all([
+        FieldMapping(channel_id=good.id, internal_field="amount", channel_field="total",
+                     transform_rule=json.dumps({"type": "multiply", "params": {"value": 100}})),
+        FieldMapping(channel_id=bad.id, internal_field="amount", channel_field="total",
+                     transform_rule="not json"),
+        FieldMapping(channel_id=bad.id, internal_field="order", channel_field="order_no"),
+    ])
+    db.commit()
+
+    path = str(tmp_path / "snapshot.bin")
+    result = write_snapshot(db, path)
+    assert result["channels"] == 2
+    assert result["mappings"] == 3
+
+    snapshot = Snapshot(path)
+    data = {"amount": 2, "order": "A1"}
+    assert TransformService.batch_transform(data, snapshot.mappings(good.id)) == {"total": 200.0}
+
+    # 工作进程与数据库路径报告相同的字段错误
+    db_mappings = ChannelStateCache().get(db, bad.id)["mappings"]
+    expected = _errors(data, db_mappings)
+    assert expected and expected[0].startswith("Transform error for amount")
+    assert _errors(data, snapshot.mappings(bad.id)) == expected
@@ -11,7 +11,10 @@ const api = axios.create({
 
 // 渠道相关API
 export const getChannelList = async (): Promise<any> => {
-  const response = await api.get('channels/');
+  // 列表页只需要基本信息，不加载包含解析字段的 config
+  const response = await api.get('channels/', {
+    params: { fields: 'name,code,status,created_at' },
+  });
   return response.data;
 };
 
@@ -25,6 +28,11 @@ export const getChannelDetail = async (channelId: number): Promise<any> => {
   return response.data;
 };
 
+export const getDocParseJob = async (channelId: number, jobId: string): Promise<any> => {
+  const response = await api.get(`channels/${channelId}/doc/jobs/${jobId}`);
+  return response.data;
+};
+
 export const uploadApiDoc = async (channelId: number, file: File): Promise<any> => {
   const formData = new FormData();
   formData.append('doc_file', file);
@@ -33,7 +41,18 @@ export const uploadApiDoc = async (channelId: number, file: File): Promise<any>
       'Content-Type': 'multipart/form-data',
     },
   });
-  return response.data;
+  // 文档在后台解析，轮询任务状态直到完成
+  const { job_id: jobId } = response.data;
+  for (;;) {
+    const job = await getDocParseJob(channelId, jobId);
+    if (job.status === 'succeeded') {
+      return { status: 'success', fields: job.result };
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || '文档解析失败');
+    }
+    await new Promise((resolve) => setTimeout(resolve, 500));
+  }
 };
 
 // 字段映射相关API